@@ -0,0 +1,94 @@
+'''
+Driver registry. Driver modules are imported only when driver class is requested, so listing
+drivers or importing the package does not pull in any of them (or optional NumPy/pyftdi):
+
+	import devices
+	print(devices.list_drivers())
+	PAC193x = devices.get_driver('PAC1934')
+	info = devices.identify(0x10, read_fn)		# probe I2C device by its ID registers
+'''
+
+import importlib
+
+
+class DriverInfo:
+	__slots__ = ('name', 'module', 'class_name', 'bus', 'addresses', 'id_reg', 'id_len', 'id_match', 'aliases')
+
+	'''
+	module, class_name: where driver class lives
+	bus: 'i2c' or 'spi'
+	addresses: possible I2C addresses
+	id_reg, id_len, id_match: ID signature, read_fn(id_reg, id_len) response is passed to id_match(response)
+	'''
+	def __init__(self, name, module, class_name, bus, addresses=(), id_reg=None, id_len=0, id_match=None, aliases=()):
+		self.name = name
+		self.module = module
+		self.class_name = class_name
+		self.bus = bus
+		self.addresses = addresses
+		self.id_reg = id_reg
+		self.id_len = id_len
+		self.id_match = id_match
+		self.aliases = aliases
+
+	def load(self):
+		return getattr(importlib.import_module(self.module), self.class_name)
+
+	def __repr__(self):
+		return 'DriverInfo(%s, %s.%s)' % (self.name, self.module, self.class_name)
+
+
+def _match_pac193x(data):
+	return 0x59 <= data[0] <= 0x5B and data[1] == 0x5D and data[2] == 0x03
+
+
+_DRIVERS = [
+	DriverInfo('PAC193x', 'devices.i2c.PAC193x', 'PAC193x', 'i2c', addresses=tuple(range(0x10, 0x20)),
+			   id_reg=0xFD, id_len=3, id_match=_match_pac193x, aliases=('PAC1932', 'PAC1933', 'PAC1934')),
+	DriverInfo('AD7156', 'devices.i2c.AD7156', 'AD7156', 'i2c', addresses=(0x48,),
+			   id_reg=0x17, id_len=1, id_match=lambda data: data[0] == 0x88),
+	DriverInfo('AD7147', 'devices.i2c.AD7147', 'AD7147', 'i2c', addresses=tuple(range(0x2C, 0x30)),
+			   id_reg=[0x00, 0x17], id_len=2, id_match=lambda data: (data[0] << 8 | data[1]) >> 4 == 0x147),
+	DriverInfo('SHT3x', 'devices.i2c.SHT3x', 'SHT3x', 'i2c', addresses=(0x44, 0x45), aliases=('SHT30', 'SHT31', 'SHT35')),
+	DriverInfo('AD5689', 'devices.spi.AD5689R', 'AD5689', 'spi', aliases=('AD5689R', 'AD5687')),
+	DriverInfo('AD56x4R', 'devices.spi.AD56x4R', 'DAC', 'spi', aliases=('AD5664R', 'AD5644R', 'AD5624R')),
+]
+
+_REGISTRY = {}
+for _info in _DRIVERS:
+	for _name in (_info.name,) + _info.aliases:
+		_REGISTRY[_name.upper()] = _info
+del _info, _name
+
+
+def list_drivers(bus=None):
+	return [info for info in _DRIVERS if bus is None or info.bus == bus]
+
+
+def get_driver_info(name):
+	info = _REGISTRY.get(name.upper())
+	if info is None:
+		raise KeyError('Unknown driver %s' % name)
+	return info
+
+
+# driver class by chip name, imports its module on first use
+def get_driver(name):
+	return get_driver_info(name).load()
+
+
+'''
+Probes I2C device at given address with ID signatures of drivers which can use that address.
+read_fn(reg, n) as passed to the drivers, failed reads are treated as no match.
+Returns DriverInfo or None
+'''
+def identify(address, read_fn):
+	for info in _DRIVERS:
+		if info.bus != 'i2c' or info.id_match is None or address not in info.addresses:
+			continue
+		try:
+			if info.id_match(read_fn(info.id_reg, info.id_len)):
+				return info
+		except Exception:
+			continue
+	return None
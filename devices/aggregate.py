@@ -0,0 +1,150 @@
+'''
+Streaming windowed aggregation of sensor readings for long term storage.
+
+Readings of several channels (e.g. PAC193x currents, SHT3x temperature and humidity) are pushed
+with their timestamps, each resolution keeps only running state of the current window, so
+memory use does not depend on window length. When sample falls into next window, summary of the
+finished window is emitted:
+	min, max, mean, last value and time integral (e.g. energy from power) per channel
+
+	agg = Aggregator(channels=4)
+	for summary in agg.push(time.time(), pac.get_currents()):
+		store(summary)
+
+Requires NumPy.
+'''
+
+import numpy as np
+
+DEFAULT_RESOLUTIONS = (1, 60, 3600)
+
+
+class Summary:
+	'''
+	Run of windows entirely inside a gap between readings is reported as a single summary of
+	windows consecutive windows with count 0, NaN min/max/mean, last value before the gap and
+	integral interpolated across the whole run. windows is 1 for all the other summaries.
+	'''
+	__slots__ = ('resolution', 'start', 'count', 'min', 'max', 'mean', 'last', 'integral', 'windows')
+
+	def __init__(self, resolution, start, count, min, max, mean, last, integral, windows=1):
+		self.resolution = resolution
+		self.start = start
+		self.count = count
+		self.min = min
+		self.max = max
+		self.mean = mean
+		self.last = last
+		self.integral = integral
+		self.windows = windows
+
+	def __repr__(self):
+		return 'Summary(resolution=%s, start=%s, count=%d, min=%s, max=%s, mean=%s, last=%s, integral=%s, windows=%d)' % (
+			self.resolution, self.start, self.count, self.min, self.max, self.mean, self.last, self.integral, self.windows)
+
+
+class _Window:
+	'''
+	Running state of a single resolution
+	'''
+	def __init__(self, resolution, channels):
+		self.resolution = resolution
+		self.start = None
+		self.count = 0
+		self.min = np.empty(channels)
+		self.max = np.empty(channels)
+		self.sum = np.zeros(channels)
+		self.integral = np.zeros(channels)
+
+	def open(self, start, values):
+		self.start = start
+		self.count = 0
+		self.min[:] = values
+		self.max[:] = values
+		self.sum[:] = 0.0
+		self.integral[:] = 0.0
+
+	def summary(self, last):
+		return Summary(self.resolution, self.start, self.count, self.min.copy(), self.max.copy(),
+					   self.sum / self.count, last.copy(), self.integral.copy())
+
+
+class Aggregator:
+	'''
+	channels: number of values in each reading
+	resolutions: window lengths in seconds, windows are aligned to multiples of their length
+	'''
+	def __init__(self, channels, resolutions=DEFAULT_RESOLUTIONS):
+		self.channels = channels
+		self._windows = [_Window(r, channels) for r in resolutions]
+		self._last = np.empty(channels)
+		self._last_time = None
+		self._area = np.empty(channels)
+
+	'''
+	Adds single reading, returns list of summaries of windows finished by this reading.
+	Integral uses trapezoidal rule, interval crossing window border is split between both windows.
+	Timestamps must not go backwards, ValueError is raised otherwise.
+	'''
+	def push(self, timestamp, values):
+		last_time = self._last_time
+		if last_time is not None and timestamp < last_time:
+			raise ValueError('Timestamp %f is older than the previous reading %f' % (timestamp, last_time))
+		values = np.asarray(values, dtype=np.float64)
+		summaries = []
+		for w in self._windows:
+			start = timestamp - timestamp % w.resolution
+			if w.start is None:
+				w.open(start, values)
+			elif start != w.start:
+				if last_time is not None:
+					self._add_area(w, last_time, min(timestamp, w.start + w.resolution), timestamp, values)
+				summaries.append(w.summary(self._last))
+				if last_time is not None:
+					skipped = int(round((start - w.start) / w.resolution)) - 1
+					if skipped > 0:
+						summaries.append(self._gap_summary(w.start + w.resolution, w.resolution, skipped, timestamp, values))
+				w.open(start, values)
+				if last_time is not None and start > last_time:
+					self._add_area(w, start, timestamp, timestamp, values)
+			elif last_time is not None:
+				self._add_area(w, last_time, timestamp, timestamp, values)
+			w.count += 1
+			w.sum += values
+			np.minimum(w.min, values, out=w.min)
+			np.maximum(w.max, values, out=w.max)
+		self._last[:] = values
+		self._last_time = timestamp
+		return summaries
+
+	'''
+	Summaries of windows still in progress, e.g. before shutdown
+	'''
+	def flush(self):
+		return [w.summary(self._last) for w in self._windows if w.count]
+
+	def _gap_summary(self, start, resolution, windows, timestamp, values):
+		nan = np.full(self.channels, np.nan)
+		integral = np.zeros(self.channels)
+		area = self._area_between(start, start + windows * resolution, timestamp, values)
+		if area is not None:
+			integral += area
+		return Summary(resolution, start, 0, nan, nan.copy(), nan.copy(), self._last.copy(), integral, windows)
+
+	def _add_area(self, window, t0, t1, timestamp, values):
+		area = self._area_between(t0, t1, timestamp, values)
+		if area is not None:
+			window.integral += area
+
+	def _area_between(self, t0, t1, timestamp, values):
+		# linear interpolation between previous reading and current one, integrated over t0..t1
+		last_time = self._last_time
+		span = timestamp - last_time
+		if span <= 0 or t1 <= t0:
+			return None
+		area = self._area
+		np.subtract(values, self._last, out=area)
+		area *= ((t0 + t1) / 2 - last_time) / span
+		area += self._last
+		area *= t1 - t0
+		return area
@@ -0,0 +1,110 @@
+'''
+Delta + bit-packing codec for blocks of raw integer codes (AD7156 12-bit, AD7147 16-bit results,
+PAC193x VBUS/VSENSE words), which change slowly between samples.
+
+Block holds N samples of C channels. For each channel first value is stored as is, the rest as
+zigzag encoded differences packed with the smallest bit width fitting all of them.
+Static channel takes only 5 bytes per block.
+
+	blob = encode_block(codes)		# codes shape (N, C) or (N,)
+	codes = decode_block(blob)		# same shape as encoded
+
+Blocks are self-delimiting, so they can be concatenated and read back with iter_blocks().
+Requires NumPy.
+'''
+
+import struct
+
+import numpy as np
+
+BLOCK_VERSION = 2
+# block was encoded from 1-D array of shape (N,)
+BLOCK_FLAG_1D = 0x01
+
+# version, flags, sample count, channel count
+_BLOCK_HEADER = struct.Struct('<BBIH')
+# first value, bit width
+_CHANNEL_HEADER = struct.Struct('<iB')
+
+
+def _packed_size(count, width):
+	return (count * width + 7) // 8
+
+
+def _pack_channel(values):
+	deltas = np.diff(values)
+	# zigzag: small negative and positive differences both map to small unsigned numbers
+	zigzag = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+	width = int(zigzag.max()).bit_length() if len(zigzag) else 0
+	header = _CHANNEL_HEADER.pack(int(values[0]), width)
+	if not width:
+		return header
+	shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+	bits = ((zigzag[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+	return header + np.packbits(bits).tobytes()
+
+
+def _unpack_channel(data, offset, count):
+	first, width = _CHANNEL_HEADER.unpack_from(data, offset)
+	offset += _CHANNEL_HEADER.size
+	values = np.empty(count, dtype=np.int64)
+	values[0] = first
+	if not width:
+		values[1:] = first
+		return values, offset
+	size = _packed_size(count - 1, width)
+	packed = np.frombuffer(data, dtype=np.uint8, count=size, offset=offset)
+	bits = np.unpackbits(packed, count=(count - 1) * width).reshape(count - 1, width)
+	shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+	zigzag = (bits.astype(np.uint64) << shifts).sum(axis=1, dtype=np.uint64)
+	deltas = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+	np.cumsum(deltas, out=values[1:])
+	values[1:] += first
+	return values, offset + size
+
+
+'''
+Encodes integer codes of shape (N,) or (N, channels) into bytes, values have to fit into int32
+'''
+def encode_block(codes):
+	codes = np.asarray(codes, dtype=np.int64)
+	flags = 0
+	if codes.ndim == 1:
+		codes = codes[:, None]
+		flags |= BLOCK_FLAG_1D
+	count, channels = codes.shape
+	if not count:
+		raise ValueError('Empty block')
+	out = [_BLOCK_HEADER.pack(BLOCK_VERSION, flags, count, channels)]
+	for c in range(channels):
+		out.append(_pack_channel(codes[:, c]))
+	return b''.join(out)
+
+
+'''
+Decodes block into array of shape (N, channels), or (N,) if it was encoded from 1-D array,
+returns it with number of bytes consumed
+'''
+def decode_block_from(data, offset=0, dtype=np.int64):
+	if data[offset] != BLOCK_VERSION:
+		raise ValueError('Unsupported block version %d' % data[offset])
+	version, flags, count, channels = _BLOCK_HEADER.unpack_from(data, offset)
+	offset += _BLOCK_HEADER.size
+	out = np.empty((count, channels), dtype=dtype)
+	for c in range(channels):
+		out[:, c], offset = _unpack_channel(data, offset, count)
+	if flags & BLOCK_FLAG_1D:
+		out = out[:, 0]
+	return out, offset
+
+
+def decode_block(data, dtype=np.int64):
+	return decode_block_from(data, 0, dtype)[0]
+
+
+# iterates over decoded blocks of concatenated encode_block() outputs
+def iter_blocks(data, dtype=np.int64):
+	offset = 0
+	while offset < len(data):
+		block, offset = decode_block_from(data, offset, dtype)
+		yield block
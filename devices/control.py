@@ -0,0 +1,209 @@
+'''
+Fixed period closed-loop control: measure -> compute -> actuate, run on a dedicated thread.
+
+	pac = PAC193x(...)
+	dac = AD5689(...)
+	law = PID(kp=0.5, ki=20.0, setpoint=0.010, output_min=0.0, output_max=2.5)
+	loop = ControlLoop(0.005, pac_current_measure(pac, Channel.A), law, dac_actuator(dac, AD5689.DAC_Channel.DAC_A))
+	loop.start()
+	...
+	loop.stop()
+	print(loop.stats)
+
+Law is any callable law(measurement, dt) returning actuator value, PID is provided.
+Loop sleeps until shortly before the deadline and spins for the rest to keep jitter low.
+If iteration takes longer than the period, overrun is counted and missed periods are skipped.
+'''
+
+import logging
+import math
+import threading
+import time
+
+# time before deadline spent busy-waiting instead of sleeping
+DEFAULT_SPIN_TIME = 0.0005
+
+
+class PID:
+	'''
+	output_min, output_max: output clamping, integrator is not wound up while output is saturated
+	'''
+	def __init__(self, kp, ki=0.0, kd=0.0, setpoint=0.0, output_min=None, output_max=None):
+		self.kp = kp
+		self.ki = ki
+		self.kd = kd
+		self.setpoint = setpoint
+		self.output_min = output_min
+		self.output_max = output_max
+		self.reset()
+
+	def reset(self):
+		self._integral = 0.0
+		self._last_error = None
+
+	def __call__(self, measurement, dt):
+		error = self.setpoint - measurement
+		derivative = 0.0
+		if self._last_error is not None and dt > 0:
+			derivative = (error - self._last_error) / dt
+		self._last_error = error
+		integral = self._integral + error * dt
+		output = self.kp * error + self.ki * integral + self.kd * derivative
+		if self.output_max is not None and output > self.output_max:
+			return self.output_max
+		if self.output_min is not None and output < self.output_min:
+			return self.output_min
+		self._integral = integral
+		return output
+
+
+class LoopStats:
+	count = 0
+	overruns = 0
+	period_min = math.inf
+	period_max = 0.0
+	period_mean = 0.0
+	# standard deviation of the period
+	jitter = 0.0
+	# largest deviation from nominal period
+	jitter_max = 0.0
+	# longest measure + compute + actuate time
+	busy_max = 0.0
+
+	def __init__(self, nominal_period):
+		self.nominal_period = nominal_period
+		self._m2 = 0.0
+
+	def add(self, period, busy):
+		self.count += 1
+		# Welford's running mean and variance
+		delta = period - self.period_mean
+		self.period_mean += delta / self.count
+		self._m2 += delta * (period - self.period_mean)
+		self.jitter = math.sqrt(self._m2 / self.count)
+		self.period_min = min(self.period_min, period)
+		self.period_max = max(self.period_max, period)
+		self.jitter_max = max(self.jitter_max, abs(period - self.nominal_period))
+		self.busy_max = max(self.busy_max, busy)
+
+	def __repr__(self):
+		return 'LoopStats(count=%d, overruns=%d, period_mean=%.6f, period_min=%.6f, period_max=%.6f, jitter=%.6f, ' \
+			   'jitter_max=%.6f, busy_max=%.6f)' % (self.count, self.overruns, self.period_mean, self.period_min,
+												   self.period_max, self.jitter, self.jitter_max, self.busy_max)
+
+
+class ControlLoop:
+	log = None
+	stats = None
+	# exception which stopped the loop, if any
+	error = None
+
+	'''
+	period: loop period in seconds
+	measure_fn(): returns measured value
+	law(measurement, dt): returns new actuator value
+	actuate_fn(value): applies the value
+	'''
+	def __init__(self, period, measure_fn, law, actuate_fn, spin_time=DEFAULT_SPIN_TIME, name='control-loop'):
+		self.log = logging.getLogger(name)
+		self.period = period
+		self._measure_fn = measure_fn
+		self._law = law
+		self._actuate_fn = actuate_fn
+		self._spin_time = spin_time
+		self._name = name
+		# each run gets its own stop event, so a thread still finishing can not be revived by start()
+		self._stop = threading.Event()
+		self._thread = None
+		self.stats = LoopStats(period)
+
+	@property
+	def running(self):
+		return self._thread is not None and self._thread.is_alive()
+
+	'''
+	Starts the loop thread, does nothing if already running.
+	Raises RuntimeError if thread of the previous run has been stopped but has not exited yet.
+	'''
+	def start(self):
+		if self.running:
+			if not self._stop.is_set():
+				return
+			raise RuntimeError('Previous control loop thread has not exited yet')
+		self._stop = threading.Event()
+		self.stats = LoopStats(self.period)
+		self.error = None
+		self._thread = threading.Thread(target=self._run, args=(self._stop,), name=self._name, daemon=True)
+		self._thread.start()
+
+	# returns False if the thread has not exited within timeout, stop() can be called again to wait for it
+	def stop(self, timeout=None):
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			if self._thread.is_alive():
+				return False
+			self._thread = None
+		return True
+
+	def _run(self, stop):
+		period = self.period
+		clock = time.perf_counter
+		measure_fn = self._measure_fn
+		law = self._law
+		actuate_fn = self._actuate_fn
+		stats = self.stats
+		last = None
+		deadline = clock()
+		try:
+			while not stop.is_set():
+				self._wait_until(deadline, stop)
+				start = clock()
+				value = law(measure_fn(), period if last is None else start - last)
+				actuate_fn(value)
+				end = clock()
+				if last is not None:
+					stats.add(start - last, end - start)
+				last = start
+				deadline += period
+				if end > deadline:
+					stats.overruns += 1
+					deadline += math.ceil((end - deadline) / period) * period
+		except Exception as e:
+			self.error = e
+			self.log.exception('Control loop stopped')
+
+	def _wait_until(self, deadline, stop):
+		remaining = deadline - time.perf_counter() - self._spin_time
+		if remaining > 0:
+			stop.wait(remaining)
+		while time.perf_counter() < deadline:
+			pass
+
+
+'''
+Measurement function reading current of PAC193x channel.
+All the channels are read in a single burst and refresh for the next iteration is issued right
+after the read, so a whole loop period passes between refresh and readout.
+'''
+def pac_current_measure(pac, channel):
+	index = channel.value
+	pac.refresh_v()
+
+	def measure_fn():
+		currents = pac.get_currents()
+		pac.refresh_v()
+		return currents[index]
+
+	return measure_fn
+
+
+# Actuator function setting AD5689 channel output voltage, one frame per call
+def dac_actuator(dac, channel):
+	to_code = dac.voltage_to_code
+	write = dac.write_code_and_update
+
+	def actuate_fn(voltage):
+		write(channel, to_code(voltage))
+
+	return actuate_fn
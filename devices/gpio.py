@@ -0,0 +1,52 @@
+'''
+Wait functions for interrupt/alert output pins of the devices (AD7156 OUT, SHT3x ALERT).
+
+Drivers accept any wait_fn(timeout) returning True once the pin becomes active and False on timeout,
+timeout of None means wait forever. Pins stay active for as long as the condition lasts, so wait
+functions report inactive to active transitions, one per event.
+GPIO library is left to the caller, helpers below cover the common cases.
+'''
+
+import time
+
+DEFAULT_POLL_INTERVAL = 0.001
+
+
+'''
+Polls pin with read_fn() returning pin level, works with any GPIO library (or FTDI GPIO).
+Last seen level is kept between calls, pin already active on the very first call counts as an event.
+'''
+def get_polled_wait_fn(read_fn, active_level=True, poll_interval=DEFAULT_POLL_INTERVAL):
+	last_active = False
+
+	def return_fn(timeout=None):
+		nonlocal last_active
+		deadline = None if timeout is None else time.monotonic() + timeout
+		while True:
+			active = bool(read_fn()) == active_level
+			if active and not last_active:
+				last_active = True
+				return True
+			last_active = active
+			if deadline is not None and time.monotonic() >= deadline:
+				return False
+			time.sleep(poll_interval)
+
+	return return_fn
+
+
+'''
+Blocks on edge events of a line requested from libgpiod (v1 Python bindings) for the active edge
+only (rising for active high pin), no CPU is used while waiting. Pending event is consumed before returning.
+'''
+def get_gpiod_wait_fn(line):
+	def return_fn(timeout=None):
+		if timeout is None:
+			while not line.event_wait(sec=3600):
+				pass
+		elif not line.event_wait(sec=int(timeout), nsec=int((timeout % 1) * 1e9)):
+			return False
+		line.event_read()
+		return True
+
+	return return_fn
@@ -0,0 +1,115 @@
+'''
+Concurrent bulk acquisition from many devices of the same type.
+
+Devices on different buses (adapters) are read in parallel on a bounded thread pool, devices
+sharing a bus are read one after another by the same worker, so bus transactions never interleave:
+
+	group = DeviceGroup(pacs, buses=pac_adapter_urls)			# adapter URL of every PAC, same order
+	currents = group.gather('get_currents')					# array of shape (devices, 4)
+	fields = group.gather('read_record')					# {'timestamp': ..., 'bus_voltage': ..., 'current': ...}
+	snapshots = group.run('snapshot')						# list in device order
+
+Results are stacked with NumPy, imported only by gather().
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 16
+
+
+class DeviceGroup:
+	'''
+	devices: driver instances
+	buses: bus key (any hashable, e.g. adapter URL or bus number) of every device,
+		by default every device is considered to be on its own bus
+	max_workers: upper bound of threads, never more than number of buses
+	'''
+	def __init__(self, devices, buses=None, max_workers=DEFAULT_MAX_WORKERS):
+		self.devices = list(devices)
+		if buses is None:
+			buses = range(len(self.devices))
+		buses = list(buses)
+		if len(buses) != len(self.devices):
+			raise ValueError('Bus key has to be given for every device')
+		self._bus_members = {}
+		for index, bus in enumerate(buses):
+			self._bus_members.setdefault(bus, []).append(index)
+		self._max_workers = max(1, min(max_workers, len(self._bus_members)))
+		self._executor = None
+
+	def __len__(self):
+		return len(self.devices)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+	'''
+	Runs op on every device, returns results in device order.
+	op is either method name or callable op(device, *args, **kwargs).
+	If return_exceptions is set, failed devices get exception as their result,
+	otherwise first exception is raised after all the devices are done.
+	'''
+	def run(self, op, *args, return_exceptions=False, **kwargs):
+		if self._executor is None:
+			self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='device-group')
+		results = [None] * len(self.devices)
+		futures = [self._executor.submit(self._run_bus, members, op, args, kwargs, results)
+				   for members in self._bus_members.values()]
+		for f in futures:
+			f.result()
+		if not return_exceptions:
+			for r in results:
+				if isinstance(r, BaseException):
+					raise r
+		return results
+
+	'''
+	Same as run(), results stacked with stack_results()
+	'''
+	def gather(self, op, *args, **kwargs):
+		return stack_results(self.run(op, *args, **kwargs))
+
+	def _run_bus(self, members, op, args, kwargs, results):
+		for index in members:
+			device = self.devices[index]
+			try:
+				if isinstance(op, str):
+					results[index] = getattr(device, op)(*args, **kwargs)
+				else:
+					results[index] = op(device, *args, **kwargs)
+			except Exception as e:
+				results[index] = e
+
+
+'''
+Stacks per device results into NumPy arrays, first dimension being the device:
+	- records (devices.records) and dicts: dict of arrays per field
+	- tuples: tuple of arrays per position, e.g. (temperatures, humidities)
+	- bytes: 2D uint8 array
+	- numbers, lists, arrays: single array
+'''
+def stack_results(results):
+	import numpy as np
+	if not results:
+		return np.empty(0)
+	first = results[0]
+	if hasattr(first, 'DTYPE'):
+		out = np.empty(len(results), dtype=np.dtype(first.DTYPE))
+		for i, r in enumerate(results):
+			out[i] = r.as_tuple()
+		return {name: out[name] for name in out.dtype.names}
+	if isinstance(first, dict):
+		return {key: np.array([r[key] for r in results]) for key in first}
+	if isinstance(first, tuple):
+		return tuple(np.array(column) for column in zip(*results))
+	if isinstance(first, (bytes, bytearray)):
+		return np.frombuffer(b''.join(results), dtype=np.uint8).reshape(len(results), -1)
+	return np.array(results)
@@ -13,21 +13,89 @@ IC expects particular start-up sequence:
 
 from enum import Enum
 import logging
+import struct
 
-from devices.utils import merge_bytes, set_bits_in_byte_16
+from devices.records import AD7147Reading
+from devices.utils import merge_bytes, set_bits_in_byte_16, read_register_ranges, write_register_ranges, \
+	verify_register_blob
 
 I2C_ADDRESS_BASE = 0x2c
 I2C_ADDRESS_COUNT = 4
 
 # register address mappings
 REG_PWR_CONTROL = 0x0000
+REG_BANK1_SIZE = 8
 REG_CHIP_ID = 0x017
 REG_STAGE_CONFIG_BASE = 0x080
 REG_STAGE_RESULT_BASE = 0x00B
 REG_STAGE_RESULT_RAW_BASE = 0x0E0
-REG_STAGE_RESULT_AVG_MAX = 0x0F9
-REG_STAGE_RESULT_AVG_MIN = 0x100
-REG_STAGE_RESULT_SF_AMBIENT = 0x0F2
+# stage 0 addresses within the result bank, see STAGE_RESULT_BANK_LAYOUT
+REG_STAGE_RESULT_SF_AMBIENT = 0x0F1
+REG_STAGE_RESULT_AVG_MAX = 0x0F8
+REG_STAGE_RESULT_HIGH_THRESHOLD = 0x0F9
+REG_STAGE_RESULT_AVG_MIN = 0x0FF
+REG_STAGE_RESULT_LOW_THRESHOLD = 0x100
+# each stage has its own bank of 36 result words, starting at REG_STAGE_RESULT_RAW_BASE
+STAGE_RESULT_BANK_WORDS = 36
+STAGE_COUNT = 12
+STAGE_CONFIG_WORDS = 8
+_STAGE_VALUES = struct.Struct('>%dH' % STAGE_COUNT)
+
+# conversion time of a single stage in full power mode, in seconds, by ADC decimation factor
+STAGE_CONVERSION_TIME = {
+	0b00: 0.000768,	# decimate by 256
+	0b01: 0.000384,	# decimate by 128
+	0b10: 0.000192,	# decimate by 64
+}
+# delay between conversion sequences in low power mode, in seconds, by LowPowerConversionDelay
+LOW_POWER_DELAY = {
+	0b00: 0.2,
+	0b01: 0.4,
+	0b10: 0.6,
+	0b11: 0.8,
+}
+
+# configuration register space captured by snapshot(), (start, length) in 16-bit words.
+# Order matches start-up sequence: stage configuration (bank 2) first, then general setup (bank 1)
+CONFIG_REGISTER_RANGES = [
+	(REG_STAGE_CONFIG_BASE, STAGE_COUNT * STAGE_CONFIG_WORDS),
+	(REG_PWR_CONTROL, REG_BANK1_SIZE),
+]
+
+# layout of a single stage result bank (Bank 3 in datasheet), in 16-bit words
+STAGE_RESULT_BANK_LAYOUT = [
+	('conv_data', 1),
+	('ff_word', 8),			# fast FIFO
+	('sf_word', 8),			# slow FIFO
+	('sf_ambient', 1),
+	('ff_avg', 1),
+	('peak_detect', 1),
+	('max_word', 4),
+	('max_avg', 1),
+	('high_threshold', 1),
+	('max_temp', 1),
+	('min_word', 4),
+	('min_avg', 1),
+	('low_threshold', 1),
+	('min_temp', 1),
+	('reserved', 2),
+]
+
+_stage_result_dtype = None
+
+
+'''
+NumPy structured dtype matching STAGE_RESULT_BANK_LAYOUT, big-endian words as sent by the IC.
+NumPy is imported only when burst readers are used.
+'''
+def stage_result_dtype():
+	global _stage_result_dtype
+	if _stage_result_dtype is None:
+		import numpy as np
+		_stage_result_dtype = np.dtype([(name, '>u2') if count == 1 else (name, '>u2', (count,))
+										for name, count in STAGE_RESULT_BANK_LAYOUT])
+	return _stage_result_dtype
+
 
 class AD7147:
 	readFn = None
@@ -75,8 +143,19 @@ class AD7147:
 		self.power_status.conversion_delay = delay
 		self._update_power_reg()
 
+	'''
+	Time between results of consecutive conversion sequences, in seconds, based on the last read_status().
+	Low power mode adds configured conversion delay after each sequence.
+	'''
+	def get_sequence_interval(self):
+		status = self.power_status
+		interval = (status.sequence_stage_number + 1) * STAGE_CONVERSION_TIME[status.ADC_decimation.value]
+		if status.power_mode == AD7147.ConfigurationReg.PowerMode.LOW_POWER:
+			interval += LOW_POWER_DELAY[status.conversion_delay.value]
+		return interval
+
 	def set_stage_config(self, config):
-		stage_base_address = REG_STAGE_CONFIG_BASE + config._id *8
+		stage_base_address = REG_STAGE_CONFIG_BASE + config._id * STAGE_CONFIG_WORDS
 		# set all pins to not connected by default
 		conn_reg_lo = 0b00111111111111
 		# same for other pins, disable offsets, do not use single ended
@@ -93,6 +172,21 @@ class AD7147:
 		stage_address = REG_STAGE_RESULT_BASE + stage._id
 		return merge_bytes(self._read_reg(stage_address, 2))
 
+	# CDC results of all the stages in a single burst, list of STAGE_COUNT values, out is filled if given
+	def read_stage_values(self, out=None):
+		values = _STAGE_VALUES.unpack(bytes(self._read_reg(REG_STAGE_RESULT_BASE, STAGE_COUNT * 2)))
+		if out is None:
+			return list(values)
+		out[:] = values
+		return out
+
+	# same as read_stage_values(), fills given record if any
+	def read_record(self, record=None):
+		if record is None:
+			record = AD7147Reading()
+		self.read_stage_values(record.stages)
+		return record.stamp()
+
 	def read_stage_value_raw(self, stage):
 		stage_address_raw = REG_STAGE_RESULT_RAW_BASE + stage._id *36
 		return merge_bytes(self._read_reg(stage_address_raw, 2))
@@ -105,10 +199,56 @@ class AD7147:
 		addr = REG_STAGE_RESULT_AVG_MIN + stage._id *36
 		return merge_bytes(self._read_reg(addr, 2))
 
+	def read_stage_value_high_threshold(self, stage):
+		addr = REG_STAGE_RESULT_HIGH_THRESHOLD + stage._id *36
+		return merge_bytes(self._read_reg(addr, 2))
+
+	def read_stage_value_low_threshold(self, stage):
+		addr = REG_STAGE_RESULT_LOW_THRESHOLD + stage._id *36
+		return merge_bytes(self._read_reg(addr, 2))
+
 	def read_stage_value_slow_fifo_ambient(self, stage):
 		addr = REG_STAGE_RESULT_SF_AMBIENT + stage._id *36
 		return merge_bytes(self._read_reg(addr, 2))
 
+	# whole result bank of a single stage in one burst, decoded as numpy.record
+	def read_stage_results(self, stage):
+		return self._read_result_banks(stage._id, 1)[0]
+
+	'''
+	Result banks of all the stages as numpy.recarray of STAGE_COUNT records.
+	max_burst limits number of bytes per transaction for transports with limited buffers,
+	by default all 864 bytes are read in a single burst.
+	'''
+	def read_all_stage_results(self, max_burst=None):
+		return self._read_result_banks(0, STAGE_COUNT, max_burst)
+
+	def _read_result_banks(self, first_stage, count, max_burst=None):
+		import numpy as np
+		addr = REG_STAGE_RESULT_RAW_BASE + first_stage * STAGE_RESULT_BANK_WORDS
+		total = count * STAGE_RESULT_BANK_WORDS * 2
+		if not max_burst or max_burst >= total:
+			data = self._read_reg(addr, total)
+		else:
+			# register addresses are word based, keep chunks word aligned
+			chunk = max(2, max_burst & ~1)
+			data = bytearray()
+			for offset in range(0, total, chunk):
+				data.extend(self._read_reg(addr + offset // 2, min(chunk, total - offset)))
+		return np.frombuffer(bytes(data), dtype=stage_result_dtype()).view(np.recarray)
+
+	# configuration registers (banks 1 and 2) as bytes blob, to be used with restore()
+	def snapshot(self):
+		return read_register_ranges(self._read_reg, CONFIG_REGISTER_RANGES, word_size=2)
+
+	'''
+	Writes back blob captured by snapshot(), one burst per register bank.
+	If verify is set, registers are read back and compared, returns False on mismatch.
+	'''
+	def restore(self, blob, verify=False):
+		write_register_ranges(self._write_reg, CONFIG_REGISTER_RANGES, blob, word_size=2)
+		self.read_status()
+		return not verify or verify_register_blob(self.log, blob, self.snapshot())
 
 	def _update_power_reg(self):
 		reg = 0
@@ -198,7 +338,7 @@ class Stage:
 	connection_mode = None
 
 	def __init__(self, ic, id):
-		if not (0 <= id <= 12):
+		if not (0 <= id < STAGE_COUNT):
 			raise ValueError('Stage id out of range')
 		self._ic = ic
 		self._id = id
@@ -220,7 +360,7 @@ class Stage:
 	def read_value_raw(self):
 		return self._ic.read_stage_value_raw(self)
 
-	# no idea what these 3 should do, but seem to contain static numbers
+	# averages of the maximum/minimum peak detector words and slow FIFO ambient value
 	def read_value_avg_min(self):
 		return self._ic.read_stage_value_avg_min(self)
 
@@ -229,6 +369,17 @@ class Stage:
 
 	def read_slow_ambient(self):
 		return self._ic.read_stage_value_slow_fifo_ambient(self)
+
+	def read_high_threshold(self):
+		return self._ic.read_stage_value_high_threshold(self)
+
+	def read_low_threshold(self):
+		return self._ic.read_stage_value_low_threshold(self)
+
+	# all of the above and the rest of result bank in a single transaction
+	def read_results(self):
+		return self._ic.read_stage_results(self)
+
 	class StagePin:
 		class ConnectionType(Enum):
 			NOT_CONNECTED = 0b00
@@ -4,7 +4,9 @@
 from enum import Enum
 import logging
 
-from commons import merge_bytes
+from devices.records import AD7156Reading
+from devices.utils import merge_bytes, read_register_ranges, write_register_ranges, verify_register_blob, \
+	set_bits_in_byte_8
 
 I2C_ADDRESS = 0x48
 # address mappings
@@ -33,6 +35,29 @@ REG_SN1 = 0x15
 REG_SN0 = 0x16
 REG_CHIP_ID = 0x17
 
+# thresholds, setup, configuration, power down timer and CAPDAC registers are contiguous
+CONFIG_REGISTER_RANGES = [(REG_CH1_SENS_THR_HI, REG_CH2_CAPDAC - REG_CH1_SENS_THR_HI + 1)]
+CAPDAC_AUTO = 0x40
+CAPDAC_VALUE_MASK = 0x3F
+
+# data and fixed threshold codes: 0 pF reads as 0x3000, full scale as 0xD000
+ZERO_SCALE_CODE = 0x3000
+FULL_SCALE_CODES = 0xA000
+
+# setup register bits
+SETUP_RANGE_POS = 6
+SETUP_HYSTERESIS_DISABLE = 0x10
+SETUP_SETTLING_MASK = 0x0F
+
+# configuration register bits
+CONFIG_THR_FIXED = 0x80
+CONFIG_THR_MODE_POS = 5
+CONFIG_EN_CH1 = 0x10
+CONFIG_EN_CH2 = 0x08
+CONFIG_MODE_MASK = 0x07
+
+POWER_DOWN_TIMER_MASK = 0x3F
+
 
 class FullScale(Enum):
 	FS_4PF = (0b11, 4.0)
@@ -53,6 +78,21 @@ class Channel(Enum):
 	Channel2 = 0x01
 
 
+# which direction of data vs threshold activates OUT pin
+class ThresholdMode(Enum):
+	NEGATIVE = 0b00
+	POSITIVE = 0b01
+	IN_WINDOW = 0b10
+	OUT_WINDOW = 0b11
+
+
+class ConversionMode(Enum):
+	IDLE = 0b000
+	CONTINUOUS = 0b001
+	SINGLE = 0b010
+	POWER_DOWN = 0b011
+
+
 class AD7156:
 
 	readFn = None
@@ -68,16 +108,21 @@ class AD7156:
 	ch_last_converted = 0
 	ch1_data_ready = False
 	ch2_data_ready = False
-	full_scale = FullScale.FS_2PF
+	# range of each channel, as set in its setup register (power-on default is 2 pF)
+	full_scale = None
 
 	'''
 	readFn(addr, n) should read n bytes from the device register addr
 	and return bytes
+	out_wait_fn(timeout) is optional, should block until OUT pin is active and return True,
+	or return False on timeout (see devices.gpio)
 	'''
-	def __init__(self, read_fn, write_fn):
+	def __init__(self, read_fn, write_fn, out_wait_fn=None):
 		self._read_fn = read_fn
 		self._write_fn = write_fn
+		self._out_wait_fn = out_wait_fn
 		self.log = logging.getLogger('AD7156')
+		self.full_scale = {Channel.Channel1: FullScale.FS_2PF, Channel.Channel2: FullScale.FS_2PF}
 
 	def get_chip_id(self):
 		return self._read_reg(REG_CHIP_ID, 1)[0]
@@ -87,7 +132,9 @@ class AD7156:
 		return response[0] << 24 | response[1] << 16 | response[2] << 8 | response[3] & 0xFF
 
 	def read_status(self):
-		response = self._read_reg(REG_STATUS, 1)[0]
+		self._parse_status(self._read_reg(REG_STATUS, 1)[0])
+
+	def _parse_status(self, response):
 		self.powered_on = not (response & 0x80)
 		self.ch2_CAPDAC_changed = not (response & 0x40)
 		self.ch2_threshold_crossed = bool(response & 0x20)
@@ -97,30 +144,142 @@ class AD7156:
 		self.ch1_data_ready = not (response & 0x02)
 		self.ch2_data_ready = not (response & 0x01)
 
-	def convert_val_to_pf(self, val):
-		return (val / 0xA000) * self.full_scale.value[1]
+	# val is 16-bit data or fixed threshold register code of the channel
+	def convert_val_to_pf(self, val, channel: Channel):
+		return ((val - ZERO_SCALE_CODE) / FULL_SCALE_CODES) * self.full_scale[channel].value[1]
+
+	def convert_pf_to_val(self, value, channel: Channel):
+		return ZERO_SCALE_CODE + round(value / self.full_scale[channel].value[1] * FULL_SCALE_CODES)
 
 	def read_value_pf(self, channel: Channel):
 		val = self.read_value_raw(channel)
-		return self.convert_val_to_pf(val)
+		return self.convert_val_to_pf(val << 4, channel)
 
 	def read_value_raw(self, channel: Channel):
 		response = self._read_reg(REG_CH1_DATA_HI + channel.value*2, 2)
 		val = merge_bytes(response) >> 4		# actual resolution is only 12 bits
 		return val
 
+	'''
+	Status and raw values of both channels in a single burst, fills given record if any.
+	Status flags are updated same as with read_status()
+	'''
+	def read_record(self, record=None):
+		if record is None:
+			record = AD7156Reading()
+		response = self._read_reg(REG_STATUS, REG_CH2_DATA_LO - REG_STATUS + 1)
+		self._parse_status(response[0])
+		record.status = response[0]
+		record.ch1 = merge_bytes(response[1:3]) >> 4
+		record.ch2 = merge_bytes(response[3:5]) >> 4
+		return record.stamp()
+
 	def set_threshold_in_pf(self, channel: Channel, value):
-		if value > self.full_scale.value[1]:
-			self.log.error("Attempt at setting too high threshold value: %3.6f, while full_scale is %3.6f", value, self.full_scale.value[1])
-			return
-		data = round(value / self.full_scale.value[1]/0xA000)
-		data = data << 4
+		self._check_pf_range(channel, value)
+		data = self.convert_pf_to_val(value, channel)
 		self._write_reg(REG_CH1_SENS_THR_HI + channel.value*3, [data >> 8, data & 0xFF])
 
 	def get_threshold_in_pf(self, channel: Channel):
 		response = self._read_reg(REG_CH1_SENS_THR_HI + channel.value*3, 2)
-		data = merge_bytes(response) >> 4
-		return self.convert_val_to_pf(data)
+		return self.convert_val_to_pf(merge_bytes(response), channel)
+
+	'''
+	Fixed threshold compares data against threshold set with set_threshold_in_pf(),
+	adaptive threshold follows slow changes of the data, offset by sensitivity
+	'''
+	def set_threshold_mode(self, mode: ThresholdMode, fixed=False):
+		reg = self._read_reg(REG_CONFIG, 1)[0]
+		reg = set_bits_in_byte_8(reg, CONFIG_THR_MODE_POS, mode.value, 2)
+		reg = reg | CONFIG_THR_FIXED if fixed else reg & ~CONFIG_THR_FIXED
+		self._write_reg(REG_CONFIG, [reg])
+
+	def set_conversion_mode(self, mode: ConversionMode, ch1_enabled=True, ch2_enabled=True):
+		reg = self._read_reg(REG_CONFIG, 1)[0] & ~(CONFIG_EN_CH1 | CONFIG_EN_CH2 | CONFIG_MODE_MASK)
+		reg |= mode.value
+		if ch1_enabled:
+			reg |= CONFIG_EN_CH1
+		if ch2_enabled:
+			reg |= CONFIG_EN_CH2
+		self._write_reg(REG_CONFIG, [reg])
+
+	'''
+	Updates channel setup register, arguments left as None are not changed.
+	full_scale: capacitive input range, also used for pF conversions of the channel
+	hysteresis: enables threshold hysteresis
+	settling: 4-bit threshold settling code, see datasheet
+	'''
+	def set_channel_setup(self, channel: Channel, full_scale: FullScale = None, hysteresis=None, settling=None):
+		addr = REG_CH1_SETUP + channel.value*3
+		reg = self._read_reg(addr, 1)[0]
+		if full_scale is not None:
+			reg = set_bits_in_byte_8(reg, SETUP_RANGE_POS, full_scale.value[0], 2)
+		if hysteresis is not None:
+			reg = reg & ~SETUP_HYSTERESIS_DISABLE if hysteresis else reg | SETUP_HYSTERESIS_DISABLE
+		if settling is not None:
+			reg = set_bits_in_byte_8(reg, 0, settling & SETUP_SETTLING_MASK, 4)
+		self._write_reg(addr, [reg])
+		self.full_scale[channel] = _full_scale_from_setup(reg)
+
+	# adaptive threshold mode only: distance of the threshold from the data average, so no zero-scale offset
+	def set_sensitivity_in_pf(self, channel: Channel, value):
+		self._check_pf_range(channel, value)
+		data = round(value / self.full_scale[channel].value[1] * FULL_SCALE_CODES)
+		self._write_reg(REG_CH1_SENS_THR_HI + channel.value*3, [data >> 8])
+
+	'''
+	Adaptive threshold mode only: 4-bit codes of how fast the average follows the data while it
+	is approaching and receding from the threshold, see datasheet
+	'''
+	def set_adaptive_timeouts(self, channel: Channel, approaching, receding):
+		self._write_reg(REG_CH1_SENS_THR_LO + channel.value*3, [(approaching & 0x0F) << 4 | (receding & 0x0F)])
+
+	'''
+	Power down timer puts device into power-down after the OUT pin is active for the set period.
+	value is 6-bit timer code, 0 disables timer, see datasheet for time units.
+	'''
+	def set_power_down_timer(self, value):
+		if not (0 <= value <= POWER_DOWN_TIMER_MASK):
+			raise ValueError('Power down timer value %d out of range' % value)
+		reg = self._read_reg(REG_POWER_DOWN_TIMER, 1)[0]
+		self._write_reg(REG_POWER_DOWN_TIMER, [(reg & ~POWER_DOWN_TIMER_MASK & 0xFF) | value])
+
+	'''
+	Blocks on OUT pin instead of polling the device, returns once per OUT activation.
+	Returns None on timeout, otherwise reads status and returns threshold crossed flags of both channels.
+	'''
+	def wait_for_threshold(self, timeout=None):
+		if self._out_wait_fn is None:
+			raise ValueError('No OUT pin wait function given')
+		if not self._out_wait_fn(timeout):
+			return None
+		self.read_status()
+		return self.ch1_threshold_crossed, self.ch2_threshold_crossed
+
+	# configuration registers as bytes blob, to be used with restore()
+	def snapshot(self):
+		return read_register_ranges(self._read_reg, CONFIG_REGISTER_RANGES)
+
+	'''
+	Writes back blob captured by snapshot() in a single burst.
+	If verify is set, registers are read back and compared, returns False on mismatch.
+	CAPDAC values are not compared for channels with auto-DAC enabled, as IC adjusts them itself.
+	Channel ranges used for pF conversions are taken from the restored setup registers.
+	'''
+	def restore(self, blob, verify=False):
+		write_register_ranges(self._write_reg, CONFIG_REGISTER_RANGES, blob)
+		for channel in Channel:
+			self.full_scale[channel] = _full_scale_from_setup(blob[REG_CH1_SETUP + channel.value*3 - REG_CH1_SENS_THR_HI])
+		mask = bytearray([0xFF] * len(blob))
+		for reg in (REG_CH1_CAPDAC, REG_CH2_CAPDAC):
+			i = reg - REG_CH1_SENS_THR_HI
+			if blob[i] & CAPDAC_AUTO:
+				mask[i] &= ~CAPDAC_VALUE_MASK & 0xFF
+		return not verify or verify_register_blob(self.log, blob, self.snapshot(), mask)
+
+	def _check_pf_range(self, channel, value):
+		full_scale = self.full_scale[channel].value[1]
+		if not (0 <= value <= full_scale):
+			raise ValueError('Value %3.6f pF out of range, full scale of %s is %3.6f pF' % (value, channel.name, full_scale))
 
 	def _read_reg(self, reg, num_bytes):
 		self.log.debug('>: [%s], expect: %d', hex(reg), num_bytes)
@@ -131,3 +290,8 @@ class AD7156:
 	def _write_reg(self, reg, data=[]):
 		self.log.debug('>: [%s], data', hex(reg), data)
 		self._write_fn(reg, data)
+
+
+def _full_scale_from_setup(reg):
+	code = (reg >> SETUP_RANGE_POS) & 0b11
+	return next(fs for fs in FullScale if fs.value[0] == code)
@@ -3,10 +3,12 @@
 
 from enum import Enum
 import logging
+import time
 
-# address mappings
-from commons import merge_bytes
+from devices.records import PAC193xReading
+from devices.utils import merge_bytes, read_register_ranges, write_register_ranges, verify_register_blob
 
+# address mappings
 CMD_REFRESH = 0x00
 REG_CTRL = 0x01
 REG_ACC_COUNT = 0x02
@@ -31,6 +33,15 @@ REG_PRODUCT_ID = 0xFD
 REG_MFR_ID = 0xFE
 REG_REV_ID = 0xFF
 
+# configuration register space captured by snapshot(), (start, length) in bytes
+CONFIG_REGISTER_RANGES = [(REG_CTRL, 1), (REG_CHANNEL_DIS, 2), (REG_SLOW, 1)]
+# restore() verifies CTRL_ACT, CHANNEL_DIS_ACT and NEG_PWR_ACT, copies of the configuration which is
+# actually in use after refresh, and SLOW, which has no active copy.
+# OVF bit, SMBus settings of CHANNEL_DIS and SLOW status bit are ignored
+ACTIVE_CONFIG_VERIFY_MASK = bytes([0xFE, 0xF0, 0xFF, 0x7F])
+# time after refresh before new values (and active configuration) can be read, in seconds
+REFRESH_SETTLING_TIME = 0.001
+
 
 class Revision(Enum):
 	PAC1932 = 0b01011001
@@ -45,6 +56,14 @@ class SampleRate(Enum):
 	RATE_8 = 0b11
 
 
+SAMPLES_PER_SECOND = {
+	SampleRate.RATE_1024: 1024,
+	SampleRate.RATE_256: 256,
+	SampleRate.RATE_64: 64,
+	SampleRate.RATE_8: 8,
+}
+
+
 class Channel(Enum):
 	A = 0x00
 	B = 0x01
@@ -100,6 +119,26 @@ class PAC193x:
 	def get_current_average(self, channel: Channel):
 		return _parse_current(self._read_reg(REG_VSENSE_AVG_BASE + channel.value, 2))
 
+	# bus voltages of all the channels in a single burst, expects all 4 channels enabled
+	# (disabled channels are skipped in block reads, unless NO_SKIP bit is set)
+	# out can be a list of 4 values to fill instead of allocating new one
+	def get_bus_voltages(self, out=None):
+		data = self._read_reg(REG_VBUS_BASE, 8)
+		if out is None:
+			out = [0.0] * 4
+		for i in range(4):
+			out[i] = _parse_voltage(data[i*2:i*2 + 2])
+		return out
+
+	# sensed currents of all the channels in a single burst, same restrictions as for get_bus_voltages()
+	def get_currents(self, out=None):
+		data = self._read_reg(REG_VSENSE_BASE, 8)
+		if out is None:
+			out = [0.0] * 4
+		for i in range(4):
+			out[i] = _parse_current(data[i*2:i*2 + 2])
+		return out
+
 	# refresh readout registers without resetting accumulators
 	# should wait at least 1ms before reading out new values
 	def refresh_v(self):
@@ -120,6 +159,41 @@ class PAC193x:
 		reg = self._read_control_reg()[0]
 		return SampleRate((reg & 0xFF) >> 6)
 
+	# configuration registers as bytes blob, to be used with restore()
+	def snapshot(self):
+		return read_register_ranges(self._read_reg, CONFIG_REGISTER_RANGES)
+
+	'''
+	Writes back blob captured by snapshot(), one burst per contiguous register range.
+	Configuration is activated with refresh, so accumulators are reset.
+	If verify is set, active configuration registers are read after refresh has settled and compared,
+	returns False on mismatch.
+	'''
+	def restore(self, blob, verify=False):
+		write_register_ranges(self._write_reg, CONFIG_REGISTER_RANGES, blob)
+		self.refresh()
+		if not verify:
+			return True
+		time.sleep(REFRESH_SETTLING_TIME)
+		return verify_register_blob(self.log, blob, self._read_active_config(), ACTIVE_CONFIG_VERIFY_MASK)
+
+	# bus voltages and currents of all the channels, two bursts, fills given record if any
+	def read_record(self, record=None):
+		if record is None:
+			record = PAC193xReading()
+		self.get_bus_voltages(record.bus_voltage)
+		self.get_currents(record.current)
+		return record.stamp()
+
+	# time between conversions at currently configured sample rate, in seconds
+	def get_sample_interval(self):
+		return 1.0 / SAMPLES_PER_SECOND[self.get_sample_rate()]
+
+	# SLOW and the active registers following it in a single burst, reordered as snapshot() blob
+	def _read_active_config(self):
+		data = bytes(self._read_reg(REG_SLOW, REG_NEG_PWR_ACT - REG_SLOW + 1))
+		return data[1:] + data[:1]
+
 	def _read_control_reg(self):
 		return self._read_reg(REG_CTRL, 1)
 
@@ -2,36 +2,147 @@
 # tested with FT232H MPSEE module
 
 import logging
+from enum import Enum
 
 # SHT3x-DIS default address (ADDR pulled to VSS (ground))
 import struct
 
+from devices.records import SHT3xReading
+
 SHT3x_I2CADDR = 0x44
 # SHT3x-DIS alternative address (ADDR pulled to VDD (supply))
 SHT3x_I2CADDR_ALT = 0x45
 
-# SHT3x-DIS Registers
-# @TODO: implement all the functionality
+# SHT3x-DIS commands
+CMD_FETCH = 0xE000
+CMD_BREAK = 0x3093
+CMD_SOFT_RESET = 0x30A2
+CMD_HEATER_ON = 0x306D
+CMD_HEATER_OFF = 0x3066
+CMD_READ_STATUS = 0xF32D
+CMD_CLEAR_STATUS = 0x3041
+
+# periodic data acquisition commands by measurements per second and repeatability
+CMD_PERIODIC = {
+	0.5: {'HIGH': 0x2032, 'MEDIUM': 0x2024, 'LOW': 0x202F},
+	1: {'HIGH': 0x2130, 'MEDIUM': 0x2126, 'LOW': 0x212D},
+	2: {'HIGH': 0x2236, 'MEDIUM': 0x2220, 'LOW': 0x222B},
+	4: {'HIGH': 0x2334, 'MEDIUM': 0x2322, 'LOW': 0x2329},
+	10: {'HIGH': 0x2737, 'MEDIUM': 0x2721, 'LOW': 0x272A},
+}
+
+# status register bits
+STATUS_ALERT_PENDING = 0x8000
+STATUS_HEATER_ON = 0x2000
+STATUS_RH_ALERT = 0x0800
+STATUS_T_ALERT = 0x0400
+STATUS_RESET_DETECTED = 0x0010
+STATUS_COMMAND_FAILED = 0x0002
+STATUS_WRITE_CRC_FAILED = 0x0001
+
+
+# alert limits as (read command, write command)
+class AlertLimit(Enum):
+	HIGH_SET = (0xE11F, 0x611D)
+	HIGH_CLEAR = (0xE114, 0x6116)
+	LOW_CLEAR = (0xE109, 0x610B)
+	LOW_SET = (0xE102, 0x6100)
+
 
 class SHT3x:
 	_readFn = None
 	_writeFn = None
+	_alertWaitFn = None
 	_log = None
 	_continuous_mode = False
-
-	def __init__(self, readFn, writeFn):
+	# flags updated by read_status()
+	alert_pending = False
+	heater_on = False
+	humidity_alert = False
+	temperature_alert = False
+	reset_detected = False
+	command_failed = False
+	write_crc_failed = False
+
+	'''
+	readFn(n) should read n bytes from the device, writeFn(None, data) write data bytes.
+	alertWaitFn(timeout) is optional, should block until ALERT pin is active and return True,
+	or return False on timeout (see devices.gpio)
+	'''
+	def __init__(self, readFn, writeFn, alertWaitFn=None):
 		self._log = logging.getLogger('SHT3x')
 		self._readFn = readFn
 		self._writeFn = writeFn
+		self._alertWaitFn = alertWaitFn
 
 	def enable_continuous_mode(self, mps=1, repeatability='HIGH'):
-		regVal = 0x21 << 8 | 0x30
-		self._writeReg(regVal)
+		if mps not in CMD_PERIODIC or repeatability not in CMD_PERIODIC[mps]:
+			raise ValueError('Unsupported periodic mode: %s mps, %s repeatability' % (mps, repeatability))
+		self._writeReg(CMD_PERIODIC[mps][repeatability])
 		self._continuous_mode = True
 
+	def disable_continuous_mode(self):
+		self._writeReg(CMD_BREAK)
+		self._continuous_mode = False
+
+	def soft_reset(self):
+		self._writeReg(CMD_SOFT_RESET)
+		self._continuous_mode = False
+
+	def set_heater(self, enable):
+		self._writeReg(CMD_HEATER_ON if enable else CMD_HEATER_OFF)
+
+	def read_status(self):
+		status = self._readWord(CMD_READ_STATUS)
+		self.alert_pending = bool(status & STATUS_ALERT_PENDING)
+		self.heater_on = bool(status & STATUS_HEATER_ON)
+		self.humidity_alert = bool(status & STATUS_RH_ALERT)
+		self.temperature_alert = bool(status & STATUS_T_ALERT)
+		self.reset_detected = bool(status & STATUS_RESET_DETECTED)
+		self.command_failed = bool(status & STATUS_COMMAND_FAILED)
+		self.write_crc_failed = bool(status & STATUS_WRITE_CRC_FAILED)
+		return status
+
+	def clear_status(self):
+		self._writeReg(CMD_CLEAR_STATUS)
+
+	'''
+	Alert limits are stored with reduced precision, 9 MSBs of temperature and 7 MSBs of humidity
+	'''
+	def set_alert_limit(self, limit: AlertLimit, temperature, humidity):
+		self._writeRegData(limit.value[1], encode_alert_limit(temperature, humidity))
+
+	def get_alert_limit(self, limit: AlertLimit):
+		return decode_alert_limit(self._readWord(limit.value[0]))
+
+	'''
+	Sets all 4 limits, alert is raised when temperature or humidity leaves low..high range and
+	cleared once it gets back by more than hysteresis
+	'''
+	def set_alert_thresholds(self, t_low, t_high, rh_low, rh_high, t_hysteresis=1.0, rh_hysteresis=2.0):
+		self.set_alert_limit(AlertLimit.HIGH_SET, t_high, rh_high)
+		self.set_alert_limit(AlertLimit.HIGH_CLEAR, t_high - t_hysteresis, rh_high - rh_hysteresis)
+		self.set_alert_limit(AlertLimit.LOW_CLEAR, t_low + t_hysteresis, rh_low + rh_hysteresis)
+		self.set_alert_limit(AlertLimit.LOW_SET, t_low, rh_low)
+
+	'''
+	Blocks on ALERT pin instead of polling the sensor, requires continuous mode. Returns once per
+	ALERT activation, not for as long as the limit stays exceeded (given edge based wait function).
+	Returns None on timeout, otherwise reads status and returns current temperature and humidity.
+	'''
+	def wait_for_alert(self, timeout=None):
+		if self._alertWaitFn is None:
+			raise ValueError('No ALERT pin wait function given')
+		if not self._continuous_mode:
+			self._log.warning('ALERT pin is only driven in continuous mode')
+		if not self._alertWaitFn(timeout):
+			return None
+		self.read_status()
+		return self.get_temp_humidity()
+
 	def get_temp_humidity(self):
 		if self._continuous_mode:
-			self._writeReg(0xE000)
+			self._writeReg(CMD_FETCH)
 
 		resp = self._readBus(6)
 		t_raw, t_crc, h_raw, h_crc = struct.unpack('>HBHB', resp)
@@ -44,6 +155,13 @@ class SHT3x:
 		return temp, h
 
 
+	# same as get_temp_humidity(), fills given record instead of allocating new one
+	def read_record(self, record=None):
+		if record is None:
+			record = SHT3xReading()
+		record.temperature, record.humidity = self.get_temp_humidity()
+		return record.stamp()
+
 	def _readReg(self, reg, numBytes):
 		self._log.debug('>: [%s], expect: %d', hex(reg), numBytes)
 		self._writeReg(reg)
@@ -55,10 +173,37 @@ class SHT3x:
 		self._log.debug('<: [{}]'.format(','.join(hex(x) for x in val)))
 		return val
 
+	def _readWord(self, cmd):
+		resp = self._readReg(cmd, 3)
+		if crc8(resp[:2]) != resp[2]:
+			self._log.warning('Bad CRC for command %s response', hex(cmd))
+		return resp[0] << 8 | resp[1]
+
 	def _writeReg(self, cmd):
 		self._log.debug('>: [%s]', hex(cmd))
 		self._writeFn(None, [cmd >> 8, cmd & 0xFF])
 
+	def _writeRegData(self, cmd, word):
+		data = [word >> 8, word & 0xFF]
+		self._log.debug('>: [%s], data %s', hex(cmd), hex(word))
+		self._writeFn(None, [cmd >> 8, cmd & 0xFF] + data + [crc8(data)])
+
+
+def _clamp(value, low, high):
+	return min(max(value, low), high)
+
+
+def encode_alert_limit(temperature, humidity):
+	t_raw = round(_clamp((temperature + 45.0) / 175.0, 0.0, 1.0) * 0xFFFF)
+	h_raw = round(_clamp(humidity / 100.0, 0.0, 1.0) * 0xFFFF)
+	return (h_raw & 0xFE00) | (t_raw >> 7)
+
+
+def decode_alert_limit(word):
+	t_raw = (word & 0x01FF) << 7
+	h_raw = word & 0xFE00
+	return (175.0 * (t_raw / 0xFFFF)) - 45.0, 100.0 * (h_raw / 0xFFFF)
+
 def crc8(buffer):
 	""" Polynomial 0x31 (x8 + x5 +x4 +1) """
 	polynomial = 0x31
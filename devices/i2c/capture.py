@@ -0,0 +1,202 @@
+'''
+Record and replay of I2C transactions.
+
+Recorder wraps driver read/write functions and logs every transaction into a compact binary log.
+Replayer feeds such a log back to the same driver code without hardware, as fast as possible:
+
+	with open('pac.llic', 'wb') as f:
+		rec = Recorder(f)
+		pac = PAC193x(rec.wrap_read(read_fn, 0x10), rec.wrap_write(write_fn, 0x10))
+		...
+
+	rep = Replayer('pac.llic')
+	pac = PAC193x(rep.get_read_fn(0x10), rep.get_write_fn(0x10))
+	...
+
+Replayed driver has to issue the same sequence of calls as the recorded one, transactions are
+matched per device address, so several devices can share the same log.
+
+Log format, little endian:
+	header: b'LLIC', version byte
+	record: timestamp (double), op (byte), address (byte), register (uint16), payload length (uint16), payload
+Payload is response for reads and written data for writes.
+'''
+
+import logging
+import struct
+import threading
+import time
+
+FILE_MAGIC = b'LLIC'
+FILE_VERSION = 1
+
+OP_READ = 0x01
+OP_WRITE = 0x02
+# read without register pointer, e.g. SHT3x
+OP_BUS_READ = 0x03
+OP_MASK = 0x0F
+# register flags
+REG_NONE = 0x10
+# register passed as 2 byte sequence, e.g. AD7147
+REG_WORD = 0x20
+
+_HEADER = struct.Struct('<4sB')
+_RECORD = struct.Struct('<dBBHH')
+
+
+def _encode_reg(reg):
+	if reg is None:
+		return REG_NONE, 0
+	if isinstance(reg, int):
+		return 0, reg
+	if len(reg) == 2:
+		return REG_WORD, reg[0] << 8 | reg[1]
+	raise ValueError('Unsupported register address %s' % reg)
+
+
+class Recorder:
+	log = None
+
+	'''
+	stream: binary file-like object, header is written immediately
+	clock: timestamp source
+	'''
+	def __init__(self, stream, clock=time.time):
+		self.log = logging.getLogger('capture')
+		self._stream = stream
+		self._clock = clock
+		self._lock = threading.Lock()
+		self.count = 0
+		stream.write(_HEADER.pack(FILE_MAGIC, FILE_VERSION))
+
+	def wrap_read(self, read_fn, address=0):
+		def return_fn(reg, num_bytes):
+			val = read_fn(reg, num_bytes)
+			self._record(OP_READ, address, reg, val)
+			return val
+
+		return return_fn
+
+	def wrap_write(self, write_fn, address=0):
+		def return_fn(reg, data):
+			write_fn(reg, data)
+			self._record(OP_WRITE, address, reg, data)
+
+		return return_fn
+
+	def wrap_bus_read(self, read_fn, address=0):
+		def return_fn(num_bytes):
+			val = read_fn(num_bytes)
+			self._record(OP_BUS_READ, address, None, val)
+			return val
+
+		return return_fn
+
+	def _record(self, op, address, reg, payload):
+		flags, reg = _encode_reg(reg)
+		payload = bytes(payload) if payload else b''
+		header = _RECORD.pack(self._clock(), op | flags, address, reg, len(payload))
+		with self._lock:
+			self._stream.write(header)
+			self._stream.write(payload)
+			self.count += 1
+
+
+'''
+Iterates over (timestamp, op, address, register, payload) records of a log.
+Register is None for transactions without register, op includes register flags.
+source is bytes-like object, path or binary file-like object
+'''
+def iter_records(source):
+	data = _load(source)
+	magic, version = _HEADER.unpack_from(data, 0)
+	if magic != FILE_MAGIC or version != FILE_VERSION:
+		raise ValueError('Not a capture log or unsupported version')
+	offset = _HEADER.size
+	record_size = _RECORD.size
+	end = len(data)
+	unpack = _RECORD.unpack_from
+	while offset < end:
+		timestamp, op, address, reg, length = unpack(data, offset)
+		offset += record_size
+		payload = bytes(data[offset:offset + length])
+		if len(payload) != length:
+			raise ValueError('Truncated capture log')
+		offset += length
+		yield timestamp, op, address, None if op & REG_NONE else reg, payload
+
+
+def _load(source):
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		return memoryview(source)
+	if isinstance(source, str):
+		with open(source, 'rb') as f:
+			return memoryview(f.read())
+	return memoryview(source.read())
+
+
+class Replayer:
+	log = None
+
+	'''
+	source: bytes-like object, path or binary file-like object with a log written by Recorder
+	strict: raise ValueError if driver issues different transaction than recorded, otherwise only log it
+	'''
+	def __init__(self, source, strict=True):
+		self.log = logging.getLogger('replay')
+		self._strict = strict
+		self._records = {}
+		self._positions = {}
+		for timestamp, op, address, reg, payload in iter_records(source):
+			self._records.setdefault(address, []).append((op, 0 if reg is None else reg, payload))
+		for address in self._records:
+			self._positions[address] = 0
+
+	def get_read_fn(self, address=0):
+		def return_fn(reg, num_bytes):
+			payload = self._next(address, OP_READ, reg)
+			if len(payload) != num_bytes:
+				self._mismatch(address, 'expected %d bytes, recorded %d' % (num_bytes, len(payload)))
+			return payload
+
+		return return_fn
+
+	def get_write_fn(self, address=0):
+		def return_fn(reg, data):
+			payload = self._next(address, OP_WRITE, reg)
+			if payload != bytes(data or b''):
+				self._mismatch(address, 'written data differs from recorded')
+
+		return return_fn
+
+	def get_bus_read_fn(self, address=0):
+		def return_fn(num_bytes):
+			payload = self._next(address, OP_BUS_READ, None)
+			if len(payload) != num_bytes:
+				self._mismatch(address, 'expected %d bytes, recorded %d' % (num_bytes, len(payload)))
+			return payload
+
+		return return_fn
+
+	# number of not yet replayed transactions of the device
+	def remaining(self, address=0):
+		return len(self._records.get(address, ())) - self._positions.get(address, 0)
+
+	def _next(self, address, op, reg):
+		position = self._positions.get(address, 0)
+		records = self._records.get(address, ())
+		if position >= len(records):
+			raise EOFError('No more recorded transactions for address %s' % hex(address))
+		self._positions[address] = position + 1
+		rec_op, rec_reg, payload = records[position]
+		flags, reg = _encode_reg(reg)
+		if rec_op != op | flags or rec_reg != reg:
+			self._mismatch(address, 'transaction %d: expected op %s reg %s, recorded op %s reg %s' %
+						   (position, hex(op | flags), hex(reg), hex(rec_op), hex(rec_reg)))
+		return payload
+
+	def _mismatch(self, address, message):
+		message = 'Replay mismatch for address %s: %s' % (hex(address), message)
+		if self._strict:
+			raise ValueError(message)
+		self.log.warning(message)
@@ -0,0 +1,244 @@
+# Linux i2c-dev (/dev/i2c-N) transport, alternative to pyftdi based helpers in tests/commons.py
+# https://www.kernel.org/doc/Documentation/i2c/dev-interface
+# usable with any adapter exposed through i2c-dev, e.g. Raspberry Pi or kernel i2c-stub for testing
+
+'''
+Register pointer write and data read are issued as a single I2C_RDWR ioctl with 2 messages,
+which results in repeated-start transaction and single syscall per register read.
+Optionally SMBus I2C block transfers can be used for 8-bit register addresses (up to 32 bytes),
+which some bus drivers handle more efficiently than generic I2C_RDWR.
+
+All ctypes buffers are preallocated and reused between transfers, grown only when larger
+transfer is requested.
+Bus object is not thread safe, caller has to serialize access to the same bus.
+'''
+
+import ctypes
+import fcntl
+import logging
+import os
+
+# ioctl numbers from linux/i2c-dev.h
+I2C_SLAVE = 0x0703
+I2C_FUNCS = 0x0705
+I2C_RDWR = 0x0707
+I2C_SMBUS = 0x0720
+
+# linux/i2c.h
+I2C_M_RD = 0x0001
+I2C_FUNC_SMBUS_READ_I2C_BLOCK = 0x04000000
+I2C_FUNC_SMBUS_WRITE_I2C_BLOCK = 0x08000000
+I2C_SMBUS_READ = 1
+I2C_SMBUS_WRITE = 0
+I2C_SMBUS_BYTE = 1
+I2C_SMBUS_I2C_BLOCK_DATA = 8
+I2C_SMBUS_BLOCK_MAX = 32
+
+DEFAULT_BUFFER_SIZE = 64
+
+
+class _I2cMsg(ctypes.Structure):
+	_fields_ = [
+		('addr', ctypes.c_uint16),
+		('flags', ctypes.c_uint16),
+		('len', ctypes.c_uint16),
+		('buf', ctypes.POINTER(ctypes.c_uint8)),
+	]
+
+
+class _I2cRdwrIoctlData(ctypes.Structure):
+	_fields_ = [
+		('msgs', ctypes.POINTER(_I2cMsg)),
+		('nmsgs', ctypes.c_uint32),
+	]
+
+
+class _I2cSmbusData(ctypes.Union):
+	_fields_ = [
+		('byte', ctypes.c_uint8),
+		('word', ctypes.c_uint16),
+		('block', ctypes.c_uint8 * (I2C_SMBUS_BLOCK_MAX + 2)),
+	]
+
+
+class _I2cSmbusIoctlData(ctypes.Structure):
+	_fields_ = [
+		('read_write', ctypes.c_uint8),
+		('command', ctypes.c_uint8),
+		('size', ctypes.c_uint32),
+		('data', ctypes.POINTER(_I2cSmbusData)),
+	]
+
+
+class I2cBus:
+	_fd = None
+	_smbus = False
+	_smbus_address = None
+	log = None
+
+	'''
+	bus: bus number N of /dev/i2c-N or full path to the device node
+	smbus: use SMBus I2C block transfers for 8-bit register addresses when adapter supports them
+	buffer_size: initial size of preallocated transfer buffers, grown on demand
+	'''
+	def __init__(self, bus, smbus=False, buffer_size=DEFAULT_BUFFER_SIZE):
+		self.log = logging.getLogger('i2c-dev')
+		path = bus if isinstance(bus, str) else '/dev/i2c-%d' % bus
+		self._fd = os.open(path, os.O_RDWR)
+		self._msgs = (_I2cMsg * 2)()
+		self._rdwr = _I2cRdwrIoctlData(ctypes.cast(self._msgs, ctypes.POINTER(_I2cMsg)), 0)
+		self._smbus_data = _I2cSmbusData()
+		self._smbus_ioctl = _I2cSmbusIoctlData(0, 0, 0, ctypes.pointer(self._smbus_data))
+		self._write_buf = None
+		self._write_ptr = None
+		self._read_buf = None
+		self._read_ptr = None
+		self._alloc_write_buf(buffer_size)
+		self._alloc_read_buf(buffer_size)
+		if smbus:
+			self._smbus = self._check_smbus_support()
+
+	def close(self):
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	'''
+	Returns read_fn(reg, num_bytes) as expected by device drivers.
+	reg is either register address byte or sequence of address bytes (e.g. 16-bit AD7147 addresses)
+	'''
+	def get_read_fn(self, address):
+		def return_fn(reg, num_bytes):
+			return self.read_reg(address, reg, num_bytes)
+
+		return return_fn
+
+	'''
+	Returns write_fn(reg, data) as expected by device drivers.
+	If reg is None, data is written as is.
+	'''
+	def get_write_fn(self, address):
+		def return_fn(reg, data):
+			self.write_reg(address, reg, data)
+
+		return return_fn
+
+	'''
+	Returns read_fn(num_bytes) for devices without register pointer (e.g. SHT3x)
+	'''
+	def get_bus_read_fn(self, address):
+		def return_fn(num_bytes):
+			return self.read(address, num_bytes)
+
+		return return_fn
+
+	def read_reg(self, address, reg, num_bytes):
+		if self._smbus and isinstance(reg, int) and 0 < num_bytes <= I2C_SMBUS_BLOCK_MAX:
+			return self._smbus_read_block(address, reg, num_bytes)
+		reg_len = self._fill_write_buf(reg, None)
+		self._ensure_read_buf(num_bytes)
+		self._set_msg(0, address, 0, reg_len, self._write_ptr)
+		self._set_msg(1, address, I2C_M_RD, num_bytes, self._read_ptr)
+		self._transfer(2)
+		return ctypes.string_at(self._read_buf, num_bytes)
+
+	def write_reg(self, address, reg, data):
+		data = data or ()
+		if self._smbus and isinstance(reg, int) and len(data) <= I2C_SMBUS_BLOCK_MAX:
+			self._smbus_write_block(address, reg, data)
+			return
+		out_len = self._fill_write_buf(reg, data)
+		self._set_msg(0, address, 0, out_len, self._write_ptr)
+		self._transfer(1)
+
+	def read(self, address, num_bytes):
+		self._ensure_read_buf(num_bytes)
+		self._set_msg(0, address, I2C_M_RD, num_bytes, self._read_ptr)
+		self._transfer(1)
+		return ctypes.string_at(self._read_buf, num_bytes)
+
+	def _fill_write_buf(self, reg, data):
+		if reg is None:
+			reg_len = 0
+		elif isinstance(reg, int):
+			reg_len = 1
+		else:
+			reg_len = len(reg)
+		data_len = len(data) if data else 0
+		self._ensure_write_buf(reg_len + data_len)
+		if reg_len == 1:
+			self._write_buf[0] = reg
+		elif reg_len:
+			self._write_buf[:reg_len] = reg
+		if data_len:
+			self._write_buf[reg_len:reg_len + data_len] = data
+		return reg_len + data_len
+
+	def _set_msg(self, index, address, flags, length, buf_ptr):
+		msg = self._msgs[index]
+		msg.addr = address
+		msg.flags = flags
+		msg.len = length
+		msg.buf = buf_ptr
+
+	def _transfer(self, msg_count):
+		self._rdwr.nmsgs = msg_count
+		fcntl.ioctl(self._fd, I2C_RDWR, self._rdwr)
+
+	def _smbus_read_block(self, address, reg, num_bytes):
+		self._select_smbus_address(address)
+		self._smbus_data.block[0] = num_bytes
+		self._smbus_access(I2C_SMBUS_READ, reg, I2C_SMBUS_I2C_BLOCK_DATA)
+		return ctypes.string_at(ctypes.addressof(self._smbus_data) + 1, num_bytes)
+
+	def _smbus_write_block(self, address, reg, data):
+		self._select_smbus_address(address)
+		if not data:
+			# plain command byte, e.g. PAC193x REFRESH
+			self._smbus_access(I2C_SMBUS_WRITE, reg, I2C_SMBUS_BYTE)
+			return
+		self._smbus_data.block[0] = len(data)
+		self._smbus_data.block[1:len(data) + 1] = data
+		self._smbus_access(I2C_SMBUS_WRITE, reg, I2C_SMBUS_I2C_BLOCK_DATA)
+
+	def _smbus_access(self, read_write, command, size):
+		self._smbus_ioctl.read_write = read_write
+		self._smbus_ioctl.command = command
+		self._smbus_ioctl.size = size
+		fcntl.ioctl(self._fd, I2C_SMBUS, self._smbus_ioctl)
+
+	def _select_smbus_address(self, address):
+		if self._smbus_address != address:
+			fcntl.ioctl(self._fd, I2C_SLAVE, address)
+			self._smbus_address = address
+
+	def _check_smbus_support(self):
+		funcs = ctypes.c_ulong()
+		fcntl.ioctl(self._fd, I2C_FUNCS, funcs)
+		required = I2C_FUNC_SMBUS_READ_I2C_BLOCK | I2C_FUNC_SMBUS_WRITE_I2C_BLOCK
+		if funcs.value & required != required:
+			self.log.warning('Adapter does not support SMBus I2C block transfers, using I2C_RDWR')
+			return False
+		return True
+
+	def _ensure_write_buf(self, size):
+		if size > len(self._write_buf):
+			self._alloc_write_buf(size)
+
+	def _ensure_read_buf(self, size):
+		if size > len(self._read_buf):
+			self._alloc_read_buf(size)
+
+	def _alloc_write_buf(self, size):
+		self._write_buf = (ctypes.c_uint8 * size)()
+		self._write_ptr = ctypes.cast(self._write_buf, ctypes.POINTER(ctypes.c_uint8))
+
+	def _alloc_read_buf(self, size):
+		self._read_buf = (ctypes.c_uint8 * size)()
+		self._read_ptr = ctypes.cast(self._read_buf, ctypes.POINTER(ctypes.c_uint8))
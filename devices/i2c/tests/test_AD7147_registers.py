@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+'''
+AD7147 result bank readers tests against an in-memory register map, no hardware needed.
+Every register reads its own 16-bit address.
+
+	python -m pytest devices/i2c/tests/test_AD7147_registers.py
+'''
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c.AD7147 import AD7147, Stage, STAGE_COUNT, STAGE_RESULT_BANK_WORDS, REG_STAGE_RESULT_RAW_BASE, \
+	REG_STAGE_RESULT_BASE
+
+REGISTERS = 0x400
+
+
+class WordRegisters:
+	def __init__(self):
+		self.memory = bytearray(b''.join(w.to_bytes(2, 'big') for w in range(REGISTERS)))
+		self.reads = []
+
+	def read_fn(self, reg, num_bytes):
+		address = reg[0] << 8 | reg[1]
+		self.reads.append((address, num_bytes))
+		return bytes(self.memory[address * 2:address * 2 + num_bytes])
+
+	def write_fn(self, reg, data):
+		address = (data[0] << 8 | data[1]) * 2
+		self.memory[address:address + len(data) - 2] = bytes(data[2:])
+
+
+@pytest.fixture
+def registers():
+	return WordRegisters()
+
+
+@pytest.fixture
+def ic(registers):
+	ic = AD7147(registers.read_fn, registers.write_fn)
+	registers.reads.clear()
+	return ic
+
+
+def test_stage_result_bank(ic, registers):
+	stage = Stage(ic, 3)
+	base = REG_STAGE_RESULT_RAW_BASE + 3 * STAGE_RESULT_BANK_WORDS
+	results = stage.read_results()
+	assert registers.reads == [(base, STAGE_RESULT_BANK_WORDS * 2)]
+	assert results.conv_data == base
+	assert list(results.ff_word) == list(range(base + 1, base + 9))
+	assert results.sf_ambient == base + 17
+	assert results.max_avg == base + 24 and results.high_threshold == base + 25
+	assert results.min_avg == base + 31 and results.low_threshold == base + 32
+	assert results.min_temp == base + 33
+
+
+def test_single_word_readers_match_bank(ic):
+	for id in (0, 11):
+		stage = Stage(ic, id)
+		results = stage.read_results()
+		assert ic.read_stage_value_raw(stage) == results.conv_data
+		assert ic.read_stage_value_slow_fifo_ambient(stage) == results.sf_ambient
+		assert ic.read_stage_value_avg_max(stage) == results.max_avg
+		assert ic.read_stage_value_avg_min(stage) == results.min_avg
+		assert stage.read_high_threshold() == results.high_threshold
+		assert stage.read_low_threshold() == results.low_threshold
+
+
+def test_all_stage_results_chunked(ic, registers):
+	results = ic.read_all_stage_results()
+	assert len(results) == STAGE_COUNT and len(registers.reads) == 1
+	assert list(results.conv_data) == [REG_STAGE_RESULT_RAW_BASE + i * STAGE_RESULT_BANK_WORDS for i in range(STAGE_COUNT)]
+	registers.reads.clear()
+	# odd limit is rounded down to whole words
+	chunked = ic.read_all_stage_results(max_burst=101)
+	assert np.array_equal(chunked, results)
+	assert all(n == 100 for address, n in registers.reads[:-1])
+	assert [address for address, n in registers.reads[:3]] == [REG_STAGE_RESULT_RAW_BASE + i * 50 for i in range(3)]
+	assert sum(n for address, n in registers.reads) == STAGE_COUNT * STAGE_RESULT_BANK_WORDS * 2
+
+
+def test_stage_values_burst(ic, registers):
+	assert ic.read_stage_values() == list(range(REG_STAGE_RESULT_BASE, REG_STAGE_RESULT_BASE + STAGE_COUNT))
+	assert registers.reads == [(REG_STAGE_RESULT_BASE, STAGE_COUNT * 2)]
+
+
+def test_stage_id_range(ic):
+	with pytest.raises(ValueError):
+		Stage(ic, STAGE_COUNT)
+	with pytest.raises(ValueError):
+		Stage(ic, -1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''
+AD7156 register layout and conversion tests against an in-memory register map, no hardware needed.
+
+	python -m pytest devices/i2c/tests/test_AD7156_registers.py
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c.AD7156 import AD7156, Channel, FullScale, ThresholdMode, ConversionMode, REG_CH1_SETUP, \
+	REG_CH2_SETUP, REG_CH1_SENS_THR_HI, REG_CONFIG, REG_POWER_DOWN_TIMER, REG_CH1_DATA_HI
+
+
+@pytest.fixture
+def memory():
+	return bytearray(0x18)
+
+
+@pytest.fixture
+def cdc(memory):
+	def read_fn(reg, num_bytes):
+		return bytes(memory[reg:reg + num_bytes])
+
+	def write_fn(reg, data):
+		memory[reg:reg + len(data)] = bytes(data)
+
+	return AD7156(read_fn, write_fn)
+
+
+def test_zero_scale_offset(cdc, memory):
+	assert cdc.convert_val_to_pf(0x3000, Channel.Channel1) == 0
+	assert cdc.convert_val_to_pf(0xD000, Channel.Channel1) == 2.0
+	assert cdc.convert_pf_to_val(1.0, Channel.Channel1) == 0x8000
+	memory[REG_CH1_DATA_HI:REG_CH1_DATA_HI + 2] = bytes([0x80, 0x00])
+	assert cdc.read_value_pf(Channel.Channel1) == 1.0
+	cdc.set_threshold_in_pf(Channel.Channel1, 0.5)
+	assert memory[REG_CH1_SENS_THR_HI:REG_CH1_SENS_THR_HI + 2] == bytes([0x58, 0x00])
+	assert cdc.get_threshold_in_pf(Channel.Channel1) == 0.5
+	with pytest.raises(ValueError):
+		cdc.set_threshold_in_pf(Channel.Channel1, 2.5)
+	with pytest.raises(ValueError):
+		cdc.set_sensitivity_in_pf(Channel.Channel1, -0.1)
+
+
+def test_full_scale_per_channel(cdc, memory):
+	memory[REG_CH2_SETUP] = 0x0A
+	cdc.set_channel_setup(Channel.Channel2, FullScale.FS_4PF, hysteresis=False, settling=0x13)
+	# range bits 7:6, hysteresis disable bit 4, settling bits 3:0
+	assert memory[REG_CH2_SETUP] == 0xD3
+	assert memory[REG_CH1_SETUP] == 0
+	assert cdc.convert_val_to_pf(0xD000, Channel.Channel2) == 4.0
+	assert cdc.convert_val_to_pf(0xD000, Channel.Channel1) == 2.0
+	cdc.set_threshold_in_pf(Channel.Channel2, 3.0)
+	assert cdc.get_threshold_in_pf(Channel.Channel2) == 3.0
+	cdc.set_sensitivity_in_pf(Channel.Channel1, 1.0)
+	assert memory[REG_CH1_SENS_THR_HI] == 0x50
+	cdc.set_channel_setup(Channel.Channel2, hysteresis=True)
+	assert memory[REG_CH2_SETUP] == 0xC3
+
+
+def test_restore_updates_full_scale(cdc, memory):
+	memory[REG_CH1_SETUP] = 0x80
+	blob = cdc.snapshot()
+	memory[REG_CH1_SETUP] = 0
+	other = AD7156(lambda reg, n: bytes(memory[reg:reg + n]), lambda reg, data: None)
+	other.restore(blob)
+	assert other.full_scale[Channel.Channel1] == FullScale.FS_1PF
+	assert other.full_scale[Channel.Channel2] == FullScale.FS_2PF
+
+
+def test_configuration_bits(cdc, memory):
+	memory[REG_CONFIG] = 0x01
+	cdc.set_threshold_mode(ThresholdMode.OUT_WINDOW, fixed=True)
+	# fixed threshold bit 7, threshold mode bits 6:5
+	assert memory[REG_CONFIG] == 0xE1
+	cdc.set_threshold_mode(ThresholdMode.POSITIVE)
+	assert memory[REG_CONFIG] == 0x21
+	cdc.set_conversion_mode(ConversionMode.SINGLE, ch1_enabled=False)
+	assert memory[REG_CONFIG] == 0x2A
+
+
+def test_power_down_timer(cdc, memory):
+	memory[REG_POWER_DOWN_TIMER] = 0xC0
+	cdc.set_power_down_timer(0x15)
+	assert memory[REG_POWER_DOWN_TIMER] == 0xD5
+	with pytest.raises(ValueError):
+		cdc.set_power_down_timer(0x40)
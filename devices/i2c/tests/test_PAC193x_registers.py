@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+'''
+PAC193x snapshot and restore tests against a fake register map, no hardware needed.
+
+	python -m pytest devices/i2c/tests/test_PAC193x_registers.py
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c.PAC193x import PAC193x, CMD_REFRESH, REG_CTRL, REG_CHANNEL_DIS, REG_NEG_PWR, REG_SLOW, \
+	REG_CTRL_ACT, REG_CHANNEL_DIS_ACT, REG_NEG_PWR_ACT
+
+
+class FakePac:
+	def __init__(self, applies_refresh=True):
+		self.applies_refresh = applies_refresh
+		self.memory = bytearray(256)
+		self.memory[0xFD:0x100] = bytes([0x5B, 0x5D, 0x03])
+
+	def read_fn(self, reg, num_bytes):
+		return bytes(self.memory[reg:reg + num_bytes])
+
+	def write_fn(self, reg, data):
+		self.memory[reg:reg + len(data)] = bytes(data)
+		if reg == CMD_REFRESH and self.applies_refresh:
+			self.memory[REG_CTRL_ACT] = self.memory[REG_CTRL]
+			# SMBus settings are not part of the active copy
+			self.memory[REG_CHANNEL_DIS_ACT] = self.memory[REG_CHANNEL_DIS] & 0xF0
+			self.memory[REG_NEG_PWR_ACT] = self.memory[REG_NEG_PWR]
+
+
+@pytest.fixture
+def blob():
+	source = FakePac()
+	source.memory[REG_CTRL] = 0x41
+	source.memory[REG_CHANNEL_DIS] = 0x32
+	source.memory[REG_NEG_PWR] = 0x90
+	source.memory[REG_SLOW] = 0x95
+	return PAC193x(source.read_fn, source.write_fn).snapshot()
+
+
+def test_snapshot_layout(blob):
+	assert blob == bytes([0x41, 0x32, 0x90, 0x95])
+
+
+def test_restore_verifies_active_registers(blob):
+	fake = FakePac()
+	pac = PAC193x(fake.read_fn, fake.write_fn)
+	assert pac.restore(blob, verify=True)
+	assert fake.memory[REG_CTRL_ACT:REG_NEG_PWR_ACT + 1] == bytes([0x41, 0x30, 0x90])
+
+
+def test_restore_detects_config_not_applied(blob, caplog):
+	fake = FakePac(applies_refresh=False)
+	pac = PAC193x(fake.read_fn, fake.write_fn)
+	# written registers read back fine, but the configuration has not been activated
+	assert pac.snapshot() != blob
+	assert not pac.restore(blob, verify=True)
+	assert pac.snapshot()[:3] == blob[:3]
+	assert 'does not match' in caplog.text
+	assert pac.restore(blob)
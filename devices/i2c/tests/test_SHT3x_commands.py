@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+'''
+SHT3x command, status and alert limit tests against a fake sensor, no hardware needed.
+
+	python -m pytest devices/i2c/tests/test_SHT3x_commands.py
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c.SHT3x import SHT3x, AlertLimit, CMD_READ_STATUS, CMD_FETCH, encode_alert_limit, \
+	decode_alert_limit, crc8
+
+# alert limit write command -> read command of the same limit
+LIMIT_READ_COMMANDS = {limit.value[1]: limit.value[0] for limit in AlertLimit}
+
+
+class FakeSensor:
+	def __init__(self):
+		self.writes = []
+		# responses to read commands, 16-bit words
+		self.words = {CMD_READ_STATUS: 0}
+		self.measurement = (0x6666, 0x8000)
+		self._response = b''
+
+	def write_fn(self, reg, data):
+		assert reg is None
+		data = bytes(data)
+		self.writes.append(data)
+		cmd = data[0] << 8 | data[1]
+		if len(data) == 5:
+			assert crc8(data[2:4]) == data[4]
+			self.words[LIMIT_READ_COMMANDS[cmd]] = data[2] << 8 | data[3]
+		if cmd in self.words:
+			self._response = _word(self.words[cmd])
+		elif cmd == CMD_FETCH:
+			self._response = _word(self.measurement[0]) + _word(self.measurement[1])
+
+	def read_fn(self, num_bytes):
+		assert len(self._response) == num_bytes
+		return self._response
+
+
+def _word(value):
+	data = bytes([value >> 8, value & 0xFF])
+	return data + bytes([crc8(data)])
+
+
+@pytest.fixture
+def sensor():
+	return FakeSensor()
+
+
+def test_crc8():
+	# example from the datasheet
+	assert crc8(bytes([0xBE, 0xEF])) == 0x92
+
+
+def test_alert_limit_encoding():
+	# default high alert set limit from the datasheet: 60 C, 80 %RH
+	assert encode_alert_limit(60.0, 80.0) == 0xCD33
+	temperature, humidity = decode_alert_limit(0xCD33)
+	assert temperature == pytest.approx(60.0, abs=0.35)
+	assert humidity == pytest.approx(80.0, abs=0.8)
+	# out of range values are clamped
+	assert encode_alert_limit(200.0, 120.0) == 0xFFFF
+	assert encode_alert_limit(-100.0, -1.0) == 0
+
+
+def test_set_alert_limit_writes_crc(sensor):
+	sht = SHT3x(sensor.read_fn, sensor.write_fn)
+	sht.set_alert_limit(AlertLimit.HIGH_SET, 60.0, 80.0)
+	assert sensor.writes[-1] == bytes([0x61, 0x1D, 0xCD, 0x33, crc8(bytes([0xCD, 0x33]))])
+	temperature, humidity = sht.get_alert_limit(AlertLimit.HIGH_SET)
+	assert temperature == pytest.approx(60.0, abs=0.35)
+
+
+def test_alert_thresholds(sensor):
+	sht = SHT3x(sensor.read_fn, sensor.write_fn)
+	sht.set_alert_thresholds(10.0, 40.0, 20.0, 70.0)
+	commands = [w[0] << 8 | w[1] for w in sensor.writes]
+	assert commands == [limit.value[1] for limit in
+						(AlertLimit.HIGH_SET, AlertLimit.HIGH_CLEAR, AlertLimit.LOW_CLEAR, AlertLimit.LOW_SET)]
+	assert sensor.writes[1][2:4] == encode_alert_limit(39.0, 68.0).to_bytes(2, 'big')
+	assert sensor.writes[2][2:4] == encode_alert_limit(11.0, 22.0).to_bytes(2, 'big')
+
+
+def test_status_flags(sensor):
+	sht = SHT3x(sensor.read_fn, sensor.write_fn)
+	sensor.words[CMD_READ_STATUS] = 0xAC13
+	assert sht.read_status() == 0xAC13
+	assert sht.alert_pending and sht.heater_on and sht.humidity_alert and sht.temperature_alert
+	assert sht.reset_detected and sht.command_failed and sht.write_crc_failed
+	sensor.words[CMD_READ_STATUS] = 0x0000
+	sht.read_status()
+	assert not (sht.alert_pending or sht.heater_on or sht.humidity_alert or sht.temperature_alert)
+	assert not (sht.reset_detected or sht.command_failed or sht.write_crc_failed)
+
+
+def test_wait_for_alert(sensor):
+	events = [False, True]
+	sht = SHT3x(sensor.read_fn, sensor.write_fn, lambda timeout: events.pop(0))
+	sht.enable_continuous_mode(mps=1)
+	assert sht.wait_for_alert(0.1) is None
+	sensor.words[CMD_READ_STATUS] = 0x8400
+	temperature, humidity = sht.wait_for_alert(0.1)
+	assert sht.alert_pending and sht.temperature_alert and not sht.humidity_alert
+	assert temperature == pytest.approx(175.0 * 0x6666 / 0xFFFF - 45.0)
+	assert humidity == pytest.approx(50.0, abs=0.01)
+	with pytest.raises(ValueError):
+		SHT3x(sensor.read_fn, sensor.write_fn).wait_for_alert(0)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+'''
+Record and replay tests, PAC193x and AD7147 drivers talk to in-memory register maps.
+
+	python -m pytest devices/i2c/tests/test_capture.py
+'''
+
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c.capture import Recorder, Replayer, iter_records, OP_READ, OP_WRITE, OP_BUS_READ, REG_NONE, REG_WORD
+from devices.i2c.AD7147 import AD7147
+from devices.i2c.PAC193x import PAC193x
+from devices.records import PAC193xReading
+
+PAC_ADDRESS = 0x10
+AD7147_ADDRESS = 0x2c
+
+
+def byte_registers():
+	memory = bytearray(range(256))
+	# PAC1934 product ID, manufacturer ID and revision
+	memory[0xFD:0x100] = bytes([0x5B, 0x5D, 0x03])
+
+	def read_fn(reg, num_bytes):
+		return bytes(memory[reg:reg + num_bytes])
+
+	def write_fn(reg, data):
+		memory[reg:reg + len(data)] = bytes(data)
+
+	return read_fn, write_fn
+
+
+def word_registers():
+	memory = bytearray(b''.join(w.to_bytes(2, 'big') for w in range(0x400)))
+
+	def read_fn(reg, num_bytes):
+		address = (reg[0] << 8 | reg[1]) * 2
+		return bytes(memory[address:address + num_bytes])
+
+	def write_fn(reg, data):
+		address = (data[0] << 8 | data[1]) * 2
+		memory[address:address + len(data) - 2] = bytes(data[2:])
+
+	return read_fn, write_fn
+
+
+def record(stream):
+	rec = Recorder(stream, clock=lambda: 1.5)
+	read_fn, write_fn = byte_registers()
+	pac = PAC193x(rec.wrap_read(read_fn, PAC_ADDRESS), rec.wrap_write(write_fn, PAC_ADDRESS))
+	read_fn, write_fn = word_registers()
+	ic = AD7147(rec.wrap_read(read_fn, AD7147_ADDRESS), rec.wrap_write(write_fn, AD7147_ADDRESS))
+	pac.refresh()
+	readings = [pac.read_record().as_tuple()[1:], ic.read_stage_values()]
+	bus_read = rec.wrap_bus_read(lambda num_bytes: bytes(num_bytes), PAC_ADDRESS)
+	bus_read(6)
+	return rec, readings
+
+
+def test_round_trip():
+	stream = io.BytesIO()
+	rec, readings = record(stream)
+	assert rec.count == 7
+	records = list(iter_records(stream.getvalue()))
+	# constructors read product ID and status
+	assert [r[1] for r in records] == [OP_READ, OP_READ | REG_WORD, OP_WRITE, OP_READ, OP_READ, OP_READ | REG_WORD,
+									   OP_BUS_READ | REG_NONE]
+	assert records[0][0] == 1.5 and records[-1][3] is None
+
+	rep = Replayer(stream.getvalue())
+	pac = PAC193x(rep.get_read_fn(PAC_ADDRESS), rep.get_write_fn(PAC_ADDRESS))
+	ic = AD7147(rep.get_read_fn(AD7147_ADDRESS), rep.get_write_fn(AD7147_ADDRESS))
+	# devices are matched by address, order between them does not matter
+	assert ic.read_stage_values() == readings[1]
+	pac.refresh()
+	reading = PAC193xReading()
+	pac.read_record(reading)
+	assert reading.as_tuple()[1:] == readings[0]
+	assert rep.get_bus_read_fn(PAC_ADDRESS)(6) == bytes(6)
+	assert rep.remaining(PAC_ADDRESS) == 0 and rep.remaining(AD7147_ADDRESS) == 0
+	with pytest.raises(EOFError):
+		pac.refresh()
+
+
+def test_strict_mismatch():
+	stream = io.BytesIO()
+	record(stream)
+	rep = Replayer(stream.getvalue())
+	with pytest.raises(ValueError):
+		rep.get_read_fn(PAC_ADDRESS)(0x00, 1)
+	rep = Replayer(stream.getvalue())
+	with pytest.raises(ValueError):
+		rep.get_write_fn(PAC_ADDRESS)(0x00, [0x01])
+
+
+def test_read_length_mismatch():
+	stream = io.BytesIO()
+	record(stream)
+	rep = Replayer(stream.getvalue())
+	with pytest.raises(ValueError):
+		rep.get_read_fn(PAC_ADDRESS)(0xFD, 2)
+	rep.get_write_fn(PAC_ADDRESS)(0x00, [])
+	rep.get_read_fn(PAC_ADDRESS)(0x07, 8)
+	rep.get_read_fn(PAC_ADDRESS)(0x0B, 8)
+	# e.g. SHT3x measurement read with a different length
+	with pytest.raises(ValueError):
+		rep.get_bus_read_fn(PAC_ADDRESS)(3)
+
+
+def test_non_strict_mismatch_is_logged(caplog):
+	stream = io.BytesIO()
+	record(stream)
+	rep = Replayer(stream.getvalue(), strict=False)
+	rep.get_write_fn(PAC_ADDRESS)(0x00, [0x01])
+	assert 'written data differs' in caplog.text
+
+
+def test_invalid_log():
+	with pytest.raises(ValueError):
+		list(iter_records(b'XXXX\x01'))
+	stream = io.BytesIO()
+	record(stream)
+	with pytest.raises(ValueError):
+		list(iter_records(stream.getvalue()[:-1]))
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+'''
+I2cBus tests without hardware, i2c-dev ioctls are served by FakeAdapter:
+	- device 0x10 has 8-bit register pointer (PAC193x-like)
+	- devices 0x2c..0x2f have 16-bit word addressed registers (AD7147)
+
+	python -m pytest devices/i2c/tests/test_i2c_dev.py
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c import i2c_dev
+from devices.i2c.AD7147 import AD7147, REG_STAGE_RESULT_BASE, STAGE_COUNT
+
+BYTE_DEVICE = 0x10
+WORD_DEVICE = 0x2c
+WORD_REGISTERS = 0x400
+
+
+class FakeAdapter:
+	def __init__(self, funcs=0xFFFFFFFF):
+		self.funcs = funcs
+		self.requests = []
+		self.slave = None
+		self.pointers = {}
+		self.memory = {
+			BYTE_DEVICE: bytearray(range(256)),
+			WORD_DEVICE: bytearray(b''.join(w.to_bytes(2, 'big') for w in range(WORD_REGISTERS))),
+		}
+
+	def ioctl(self, fd, request, arg):
+		self.requests.append(request)
+		if request == i2c_dev.I2C_RDWR:
+			for i in range(arg.nmsgs):
+				self._message(arg.msgs[i])
+		elif request == i2c_dev.I2C_SLAVE:
+			self.slave = arg
+		elif request == i2c_dev.I2C_FUNCS:
+			arg.value = self.funcs
+		elif request == i2c_dev.I2C_SMBUS:
+			self._smbus(arg)
+		return 0
+
+	def _message(self, msg):
+		memory = self.memory[msg.addr]
+		if msg.flags & i2c_dev.I2C_M_RD:
+			pointer = self.pointers[msg.addr]
+			for i in range(msg.len):
+				msg.buf[i] = memory[pointer + i]
+			return
+		data = bytes(msg.buf[i] for i in range(msg.len))
+		if msg.addr == WORD_DEVICE:
+			pointer, data = (data[0] << 8 | data[1]) * 2, data[2:]
+		else:
+			pointer, data = data[0], data[1:]
+		self.pointers[msg.addr] = pointer
+		memory[pointer:pointer + len(data)] = data
+
+	def _smbus(self, arg):
+		if arg.size == i2c_dev.I2C_SMBUS_BYTE:
+			# command byte only, sets register pointer
+			self.pointers[self.slave] = arg.command
+			return
+		assert arg.size == i2c_dev.I2C_SMBUS_I2C_BLOCK_DATA
+		memory = self.memory[self.slave]
+		block = arg.data.contents.block
+		length = block[0]
+		if arg.read_write == i2c_dev.I2C_SMBUS_READ:
+			for i in range(length):
+				block[1 + i] = memory[arg.command + i]
+		else:
+			memory[arg.command:arg.command + length] = bytes(block[1:1 + length])
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+	fake = FakeAdapter()
+	monkeypatch.setattr(i2c_dev.fcntl, 'ioctl', fake.ioctl)
+	monkeypatch.setattr(i2c_dev.os, 'open', lambda path, flags: 3)
+	monkeypatch.setattr(i2c_dev.os, 'close', lambda fd: None)
+	return fake
+
+
+def test_register_read_is_single_transfer(adapter):
+	bus = i2c_dev.I2cBus(1)
+	assert bus.get_read_fn(BYTE_DEVICE)(0xFD, 3) == bytes([0xFD, 0xFE, 0xFF])
+	assert adapter.requests == [i2c_dev.I2C_RDWR]
+
+
+def test_register_write_and_buffer_growth(adapter):
+	bus = i2c_dev.I2cBus(1, buffer_size=2)
+	bus.get_write_fn(BYTE_DEVICE)(0x01, [0xAA, 0xBB, 0xCC])
+	read_fn = bus.get_read_fn(BYTE_DEVICE)
+	assert read_fn(0x01, 3) == bytes([0xAA, 0xBB, 0xCC])
+	assert read_fn(0x00, 100) == bytes([0x00, 0xAA, 0xBB, 0xCC]) + bytes(range(4, 100))
+
+
+def test_bus_read_uses_last_pointer(adapter):
+	bus = i2c_dev.I2cBus(1)
+	bus.get_write_fn(BYTE_DEVICE)(0x20, None)
+	assert bus.get_bus_read_fn(BYTE_DEVICE)(2) == bytes([0x20, 0x21])
+
+
+def test_16_bit_register_address(adapter):
+	bus = i2c_dev.I2cBus('/dev/i2c-1')
+	bus.get_write_fn(WORD_DEVICE)(None, [0x00, 0x80, 0x12, 0x34])
+	assert bus.get_read_fn(WORD_DEVICE)([0x00, 0x80], 4) == bytes([0x12, 0x34, 0x00, 0x81])
+
+
+def test_ad7147_through_bus(adapter):
+	bus = i2c_dev.I2cBus(1)
+	ic = AD7147(bus.get_read_fn(WORD_DEVICE), bus.get_write_fn(WORD_DEVICE))
+	assert ic.read_stage_values() == list(range(REG_STAGE_RESULT_BASE, REG_STAGE_RESULT_BASE + STAGE_COUNT))
+	blob = bytearray(ic.snapshot())
+	blob[1] ^= 0x01
+	assert ic.restore(bytes(blob), verify=True)
+	assert adapter.memory[WORD_DEVICE][0x080 * 2 + 1] == blob[1]
+	assert all(r == i2c_dev.I2C_RDWR for r in adapter.requests)
+
+
+def test_smbus_block_transfers(adapter):
+	bus = i2c_dev.I2cBus(1, smbus=True)
+	bus.get_write_fn(BYTE_DEVICE)(0x01, [0xAA, 0xBB])
+	assert bus.get_read_fn(BYTE_DEVICE)(0x00, 4) == bytes([0x00, 0xAA, 0xBB, 0x03])
+	assert i2c_dev.I2C_RDWR not in adapter.requests
+	assert adapter.requests.count(i2c_dev.I2C_SLAVE) == 1
+	# longer than SMBus block and 16-bit addresses still go through I2C_RDWR
+	assert bus.get_read_fn(BYTE_DEVICE)(0x00, 40) == bytes([0x00, 0xAA, 0xBB]) + bytes(range(3, 40))
+	assert bus.get_read_fn(WORD_DEVICE)([0x00, 0x17], 2) == bytes([0x00, 0x17])
+	assert adapter.requests[-2:] == [i2c_dev.I2C_RDWR, i2c_dev.I2C_RDWR]
+
+
+def test_smbus_write_without_data(adapter):
+	bus = i2c_dev.I2cBus(1, smbus=True)
+	bus.get_write_fn(BYTE_DEVICE)(0x20, None)
+	assert adapter.pointers[BYTE_DEVICE] == 0x20
+	bus.get_write_fn(BYTE_DEVICE)(0x21, [])
+	assert adapter.pointers[BYTE_DEVICE] == 0x21
+	assert adapter.requests == [i2c_dev.I2C_FUNCS, i2c_dev.I2C_SLAVE, i2c_dev.I2C_SMBUS, i2c_dev.I2C_SMBUS]
+
+
+def test_smbus_fallback_without_support(adapter):
+	adapter.funcs = 0
+	bus = i2c_dev.I2cBus(1, smbus=True)
+	assert bus.get_read_fn(BYTE_DEVICE)(0x10, 2) == bytes([0x10, 0x11])
+	assert adapter.requests == [i2c_dev.I2C_FUNCS, i2c_dev.I2C_RDWR]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+'''
+TouchDetector tests on synthetic frames.
+
+	python -m pytest devices/i2c/tests/test_touch.py
+'''
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.i2c.AD7147 import STAGE_COUNT
+from devices.i2c.touch import TouchDetector, read_frame
+
+
+class FakeChip:
+	def __init__(self, base):
+		self.base = base
+
+	def read_stage_values(self, out=None):
+		return [self.base + i for i in range(STAGE_COUNT)]
+
+
+def frames(values, chips=2):
+	return [np.full((chips, STAGE_COUNT), 10000) + v for v in values]
+
+
+@pytest.mark.parametrize('kwargs', [{'debounce': 0}, {'alpha': 0}, {'alpha': 1.5}])
+def test_invalid_parameters(kwargs):
+	with pytest.raises(ValueError):
+		TouchDetector(**kwargs)
+
+
+def test_read_frame_reuses_buffer():
+	out = np.zeros((2, STAGE_COUNT), dtype=np.uint16)
+	frame = read_frame([FakeChip(100), FakeChip(200)], out)
+	assert frame is out
+	assert frame[1, 3] == 203
+
+
+def test_touch_and_release_are_debounced():
+	detector = TouchDetector(chips=2, threshold=500, hysteresis=50, debounce=2)
+	stream = frames([0, 0])
+	touch = stream[0].copy()
+	touch[1, 5] += 600
+	# single frame glitch is ignored
+	stream += [touch, stream[0], touch, touch, touch]
+	# within the hysteresis band stage stays touched, release needs delta below threshold - hysteresis
+	band = stream[0].copy()
+	band[1, 5] += 460
+	stream += [band, band, stream[0], stream[0]]
+	result = detector.process(stream)
+	assert [i for i, events in result] == [5, 10]
+	touched, released = result[0][1], result[1][1]
+	assert (touched['chip'][0], touched['stage'][0], touched['touched'][0]) == (1, 5, True)
+	assert touched['delta'][0] == 600
+	assert (released['chip'][0], released['stage'][0], released['touched'][0]) == (1, 5, False)
+
+
+def test_baseline_frozen_while_touched():
+	detector = TouchDetector(chips=1, alpha=1.0, debounce=1)
+	detector.update(np.zeros(STAGE_COUNT))
+	frame = np.full(STAGE_COUNT, 100.0)
+	frame[0] = 1000
+	assert len(detector.update(frame)) == 1
+	assert detector.baseline[0, 0] == 0
+	assert detector.baseline[0, 1] == 100
+
+
+def test_negative_polarity():
+	polarity = np.ones(STAGE_COUNT)
+	polarity[2] = -1
+	detector = TouchDetector(chips=1, debounce=1, polarity=polarity)
+	detector.update(np.full(STAGE_COUNT, 10000))
+	frame = np.full(STAGE_COUNT, 10000)
+	frame[2] -= 600
+	frame[3] -= 600
+	events = detector.update(frame)
+	assert list(events['stage']) == [2]
@@ -0,0 +1,117 @@
+'''
+Host side baseline tracking and touch detection for AD7147 stage results.
+
+All the stages of all the chips are processed at once, frame is array of shape (chips, STAGE_COUNT)
+as returned by read_frame(). For every stage:
+	- baseline follows the signal with exponential moving average while stage is not touched
+	- touch is detected when signal deviates from baseline by more than threshold + hysteresis
+	- release is detected when deviation drops below threshold - hysteresis
+	- state change is reported only after it has been seen for debounce consecutive frames
+Only state changes are returned from update(), as record array of TOUCH_EVENT_DTYPE.
+
+Requires NumPy.
+'''
+
+import numpy as np
+
+from devices.i2c.AD7147 import STAGE_COUNT
+
+TOUCH_EVENT_DTYPE = np.dtype([
+	('chip', np.intp),
+	('stage', np.intp),
+	('touched', np.bool_),
+	('delta', np.float64),
+])
+
+
+'''
+Reads CDC results of all the stages of all the given AD7147 instances, one burst per chip.
+out can be preallocated array of shape (len(ics), STAGE_COUNT) to avoid allocation per frame.
+'''
+def read_frame(ics, out=None):
+	if out is None:
+		out = np.empty((len(ics), STAGE_COUNT), dtype=np.uint16)
+	for i, ic in enumerate(ics):
+		out[i] = ic.read_stage_values()
+	return out
+
+
+class TouchDetector:
+	baseline = None
+	touched = None
+
+	'''
+	chips: number of AD7147 ICs in a frame
+	threshold, hysteresis: in CDC codes, scalar or array broadcastable to (chips, STAGE_COUNT)
+	alpha: baseline tracking coefficient, 0..1, smaller values track slower
+	debounce: number of consecutive frames needed to change the state
+	polarity: 1 if touch increases CDC value, -1 if it decreases, scalar or per stage array
+	'''
+	def __init__(self, chips=1, threshold=500, hysteresis=50, alpha=0.01, debounce=3, polarity=1, stages=STAGE_COUNT):
+		if debounce < 1:
+			raise ValueError('Debounce has to be at least 1 frame')
+		if not (0 < alpha <= 1):
+			raise ValueError('Baseline tracking coefficient alpha has to be in (0, 1]')
+		shape = (chips, stages)
+		self._shape = shape
+		self.threshold = np.broadcast_to(np.asarray(threshold, dtype=np.float64), shape)
+		self.hysteresis = np.broadcast_to(np.asarray(hysteresis, dtype=np.float64), shape)
+		self.polarity = np.broadcast_to(np.asarray(polarity, dtype=np.float64), shape)
+		self.alpha = alpha
+		self.debounce = debounce
+		self.baseline = None
+		self.touched = np.zeros(shape, dtype=np.bool_)
+		self._counter = np.zeros(shape, dtype=np.int32)
+		self._on_level = self.threshold + self.hysteresis
+		self._off_level = self.threshold - self.hysteresis
+		self._delta = np.empty(shape, dtype=np.float64)
+
+	def reset(self):
+		self.baseline = None
+		self.touched[:] = False
+		self._counter[:] = 0
+
+	'''
+	Processes single frame, returns array of TOUCH_EVENT_DTYPE records for stages changing state.
+	First frame after construction or reset() only initializes baselines.
+	'''
+	def update(self, frame):
+		frame = np.asarray(frame, dtype=np.float64).reshape(self._shape)
+		if self.baseline is None:
+			self.baseline = frame.copy()
+			return np.empty(0, dtype=TOUCH_EVENT_DTYPE)
+
+		delta = self._delta
+		np.subtract(frame, self.baseline, out=delta)
+		delta *= self.polarity
+		candidate = np.where(self.touched, delta > self._off_level, delta > self._on_level)
+		pending = candidate != self.touched
+		self._counter += 1
+		self._counter[~pending] = 0
+		flip = self._counter >= self.debounce
+		self.touched ^= flip
+		self._counter[flip] = 0
+
+		# baseline is frozen while stage is touched or about to change its state
+		tracking = ~(self.touched | pending)
+		self.baseline[tracking] += self.alpha * (frame[tracking] - self.baseline[tracking])
+
+		chip, stage = np.nonzero(flip)
+		events = np.empty(len(chip), dtype=TOUCH_EVENT_DTYPE)
+		events['chip'] = chip
+		events['stage'] = stage
+		events['touched'] = self.touched[chip, stage]
+		events['delta'] = delta[chip, stage]
+		return events
+
+	'''
+	Processes sequence of frames (shape (N, chips, stages)), returns list of (frame index, events)
+	for frames with at least one state change.
+	'''
+	def process(self, frames):
+		result = []
+		for i, frame in enumerate(frames):
+			events = self.update(frame)
+			if len(events):
+				result.append((i, events))
+		return result
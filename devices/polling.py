@@ -0,0 +1,103 @@
+'''
+Adaptive polling: interval between reads grows while readings stay static and drops back
+as soon as reading changes by more than threshold.
+Interval never goes below device conversion interval, as there can not be any new data any sooner.
+
+	pac = PAC193x(...)
+	poller = AdaptivePoller.for_pac193x(pac, threshold=0.001, max_interval=5.0)
+	poller.run(lambda: pac.get_currents(), print)
+
+Requires NumPy.
+'''
+
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_MAX_INTERVAL = 1.0
+DEFAULT_BACKOFF = 2.0
+
+
+class AdaptivePoller:
+	interval = 0.0
+	# readings taken so far
+	count = 0
+
+	'''
+	min_interval: shortest interval, normally device conversion interval, in seconds
+	max_interval: longest interval used while readings are static
+	threshold: absolute change of any value in a reading, which is considered activity
+	backoff: factor interval is multiplied with after each static reading
+	ramp: factor interval is divided by after active reading, by default it drops straight to min_interval
+	'''
+	def __init__(self, min_interval, max_interval=DEFAULT_MAX_INTERVAL, threshold=0, backoff=DEFAULT_BACKOFF, ramp=None):
+		if min_interval <= 0 or max_interval < min_interval:
+			raise ValueError('Invalid polling interval range %f..%f' % (min_interval, max_interval))
+		self.min_interval = min_interval
+		self.max_interval = max_interval
+		self.threshold = threshold
+		self.backoff = backoff
+		self.ramp = ramp
+		self.interval = min_interval
+		self._last = None
+
+	@classmethod
+	def for_pac193x(cls, pac, **kwargs):
+		return cls(pac.get_sample_interval(), **kwargs)
+
+	@classmethod
+	def for_ad7147(cls, ic, **kwargs):
+		ic.read_status()
+		return cls(ic.get_sequence_interval(), **kwargs)
+
+	def reset(self):
+		self.interval = self.min_interval
+		self._last = None
+
+	'''
+	Takes new reading, returns interval to wait before the next one.
+	Reading can be a number, sequence or array of numbers (e.g. read_frame()), or a devices.records
+	record, in which case all the fields except timestamp are compared.
+	Reading is copied, so buffers reused between reads are fine.
+	'''
+	def update(self, value):
+		self.count += 1
+		last = self._last
+		value = _as_array(value)
+		self._last = value
+		if last is not None and not self._changed(last, value):
+			self.interval = min(self.interval * self.backoff, self.max_interval)
+		elif self.ramp:
+			self.interval = max(self.interval / self.ramp, self.min_interval)
+		else:
+			self.interval = self.min_interval
+		return self.interval
+
+	'''
+	Calls read_fn() and passes result to callback(value) until stop_event is set (or forever).
+	Intervals are measured from the start of the previous read.
+	'''
+	def run(self, read_fn, callback, stop_event=None):
+		if stop_event is None:
+			stop_event = threading.Event()
+		while not stop_event.is_set():
+			start = time.monotonic()
+			value = read_fn()
+			callback(value)
+			remaining = start + self.update(value) - time.monotonic()
+			if remaining > 0:
+				stop_event.wait(remaining)
+
+	def _changed(self, last, value):
+		if last.shape != value.shape:
+			return True
+		return bool(value.size) and np.abs(value - last).max() > self.threshold
+
+
+# flat float copy of a reading, unsigned codes can not wrap around when subtracted
+def _as_array(value):
+	if hasattr(value, 'DTYPE'):
+		return np.concatenate([np.ravel(np.asarray(getattr(value, f[0]), dtype=np.float64))
+							   for f in value.DTYPE if f[0] != 'timestamp'])
+	return np.array(value, dtype=np.float64).ravel()
@@ -0,0 +1,139 @@
+'''
+Measurement records of the devices and fixed capacity ring buffer for them.
+
+Records use __slots__, can be reused between readings (drivers' read_record(record) fill
+given record instead of allocating new one) and describe their NumPy structured dtype in DTYPE.
+RingBuffer keeps last N records in a preallocated structured array and hands out views into it:
+
+	ring = RingBuffer(3600, SHT3xReading)
+	rec = SHT3xReading()
+	while True:
+		ring.append(sht.read_record(rec))
+	...
+	older, newer = ring.views()
+
+NumPy is needed only for RingBuffer.
+'''
+
+import time
+
+
+class Reading:
+	__slots__ = ('timestamp',)
+	# NumPy dtype description, list of (name, type[, shape])
+	DTYPE = [('timestamp', 'f8')]
+
+	def __init__(self, timestamp=0.0):
+		self.timestamp = timestamp
+
+	def stamp(self):
+		self.timestamp = time.time()
+		return self
+
+	def as_tuple(self):
+		return tuple(getattr(self, f[0]) for f in self.DTYPE)
+
+	def __repr__(self):
+		return '%s(%s)' % (type(self).__name__, ', '.join('%s=%s' % (f[0], getattr(self, f[0])) for f in self.DTYPE))
+
+
+class PAC193xReading(Reading):
+	__slots__ = ('bus_voltage', 'current')
+	DTYPE = Reading.DTYPE + [('bus_voltage', 'f8', (4,)), ('current', 'f8', (4,))]
+
+	def __init__(self, timestamp=0.0, bus_voltage=None, current=None):
+		super().__init__(timestamp)
+		self.bus_voltage = bus_voltage if bus_voltage is not None else [0.0] * 4
+		self.current = current if current is not None else [0.0] * 4
+
+
+class SHT3xReading(Reading):
+	__slots__ = ('temperature', 'humidity')
+	DTYPE = Reading.DTYPE + [('temperature', 'f4'), ('humidity', 'f4')]
+
+	def __init__(self, timestamp=0.0, temperature=0.0, humidity=0.0):
+		super().__init__(timestamp)
+		self.temperature = temperature
+		self.humidity = humidity
+
+
+class AD7156Reading(Reading):
+	__slots__ = ('status', 'ch1', 'ch2')
+	# raw 12-bit codes, status register as is
+	DTYPE = Reading.DTYPE + [('status', 'u1'), ('ch1', 'u2'), ('ch2', 'u2')]
+
+	def __init__(self, timestamp=0.0, status=0, ch1=0, ch2=0):
+		super().__init__(timestamp)
+		self.status = status
+		self.ch1 = ch1
+		self.ch2 = ch2
+
+
+class AD7147Reading(Reading):
+	__slots__ = ('stages',)
+	# CDC results of all 12 stages
+	DTYPE = Reading.DTYPE + [('stages', 'u2', (12,))]
+
+	def __init__(self, timestamp=0.0, stages=None):
+		super().__init__(timestamp)
+		self.stages = stages if stages is not None else [0] * 12
+
+
+class RingBuffer:
+	'''
+	capacity: number of records kept
+	record_type: Reading subclass or anything NumPy accepts as dtype
+	'''
+	def __init__(self, capacity, record_type):
+		import numpy as np
+		if capacity <= 0:
+			raise ValueError('Capacity has to be positive')
+		self.dtype = np.dtype(getattr(record_type, 'DTYPE', record_type))
+		self.capacity = capacity
+		self._data = np.zeros(capacity, dtype=self.dtype)
+		self._fields = self.dtype.names
+		self._next = 0
+		self._count = 0
+
+	def __len__(self):
+		return self._count
+
+	def append(self, record):
+		row = self._data[self._next]
+		for name in self._fields:
+			row[name] = getattr(record, name)
+		self._advance()
+
+	# values in dtype field order
+	def append_values(self, *values):
+		self._data[self._next] = values
+		self._advance()
+
+	def clear(self):
+		self._next = 0
+		self._count = 0
+
+	# last appended record as view into the buffer, None if empty
+	def latest(self):
+		if not self._count:
+			return None
+		return self._data[self._next - 1]
+
+	'''
+	Stored records in chronological order as two views into the buffer (second one is empty
+	until buffer wraps around). Views are overwritten by later appends.
+	'''
+	def views(self):
+		if self._count < self.capacity:
+			return self._data[:self._count], self._data[:0]
+		return self._data[self._next:], self._data[:self._next]
+
+	# copy of stored records in chronological order
+	def to_array(self):
+		import numpy as np
+		return np.concatenate(self.views())
+
+	def _advance(self):
+		self._next = (self._next + 1) % self.capacity
+		if self._count < self.capacity:
+			self._count += 1
@@ -47,6 +47,8 @@ class AD5689:
         self._write_fn = spi_write_fn
         reference_gain = reference_gain if reference_gain == 2 else 1
         self._lsb = (reference_value * reference_gain) / pow(2, 16)
+        # frame reused by write_code_and_update()
+        self._frame = bytearray(3)
 
     def enable_internal_ref(self, enable=True):
         self._write_data(AD5689.DAC_Command.CMD_ENABLE_INTERNAL_REF, 0x00, enable)
@@ -69,6 +71,19 @@ class AD5689:
     def update_channel_value(self, channel, voltage):
         self._write_data(AD5689.DAC_Command.CMD_UPDATE_DAC_N, channel, int(voltage / self._lsb))
 
+    def voltage_to_code(self, voltage):
+        return min(max(int(voltage / self._lsb), 0), 0xFFFF)
+
+    '''
+    Fast path for control loops: code is precomputed with voltage_to_code(), frame buffer is reused
+    '''
+    def write_code_and_update(self, channel, code):
+        frame = self._frame
+        frame[0] = (AD5689.DAC_Command.CMD_WRITE_AND_UPDATE_N.value << 4) | channel.value
+        frame[1] = code >> 8
+        frame[2] = code & 0xFF
+        self._write_fn(frame)
+
     def _write_data(self, command, channel, data):
         '''
         24 bits (3 bytes) of data are sent.
@@ -0,0 +1,181 @@
+'''
+Linux spidev (/dev/spidevX.Y) transport, alternative to pyftdi SpiController used in tests
+https://www.kernel.org/doc/Documentation/spi/spidev
+
+get_write_fn() returns function accepting byte array as expected by AD5689 and AD56x4R.DAC.
+Within batch() context writes are not sent immediately, but queued as separate frames
+and sent out with single SPI_IOC_MESSAGE(N) ioctl, with chip select toggled between frames:
+
+	spi = SpiDev(0, 0, mode=1, speed_hz=10000000)
+	DAC = AD5689(spi.get_write_fn())
+	with spi.batch():
+		DAC.set_channel_value(AD5689.DAC_Channel.DAC_A, 0.35)
+		DAC.set_channel_value(AD5689.DAC_Channel.DAC_B, 0.2)
+		DAC.update_channel_value(AD5689.DAC_Channel.DAC_BOTH, 0)
+
+Transfer descriptors and TX buffer are preallocated for max_frames frames of frame_size bytes,
+longer frames or more frames than that are split into several ioctls.
+'''
+
+import ctypes
+import fcntl
+import logging
+import os
+import struct
+from contextlib import contextmanager
+
+SPI_IOC_MAGIC = ord('k')
+_IOC_WRITE = 1
+# struct spi_ioc_transfer from linux/spi/spidev.h
+SPI_IOC_TRANSFER_SIZE = 32
+# size field of ioctl request number is 14 bits wide
+SPI_IOC_MAX_TRANSFERS = ((1 << 14) - 1) // SPI_IOC_TRANSFER_SIZE
+# default spidev.bufsiz module parameter, total bytes per message
+SPIDEV_BUFSIZ = 4096
+
+
+def _iow(nr, size):
+	return (_IOC_WRITE << 30) | (size << 16) | (SPI_IOC_MAGIC << 8) | nr
+
+
+SPI_IOC_WR_MODE = _iow(1, 1)
+SPI_IOC_WR_BITS_PER_WORD = _iow(3, 1)
+SPI_IOC_WR_MAX_SPEED_HZ = _iow(4, 4)
+
+
+def spi_ioc_message(n):
+	return _iow(0, n * SPI_IOC_TRANSFER_SIZE)
+
+
+class _SpiIocTransfer(ctypes.Structure):
+	_fields_ = [
+		('tx_buf', ctypes.c_uint64),
+		('rx_buf', ctypes.c_uint64),
+		('len', ctypes.c_uint32),
+		('speed_hz', ctypes.c_uint32),
+		('delay_usecs', ctypes.c_uint16),
+		('bits_per_word', ctypes.c_uint8),
+		('cs_change', ctypes.c_uint8),
+		('tx_nbits', ctypes.c_uint8),
+		('rx_nbits', ctypes.c_uint8),
+		('word_delay_usecs', ctypes.c_uint8),
+		('pad', ctypes.c_uint8),
+	]
+
+
+class SpiDev:
+	_fd = None
+	_batching = False
+	log = None
+
+	'''
+	bus, cs: X and Y of /dev/spidevX.Y, or bus as full path to the device node
+	frame_size: expected frame length in bytes, 3 for both AD5689 and AD56x4R
+	max_frames: number of frames sent with a single ioctl
+	bufsiz: spidev.bufsiz kernel module parameter, limits total bytes per ioctl
+	'''
+	def __init__(self, bus, cs=0, mode=0, speed_hz=1000000, bits_per_word=8, frame_size=3, max_frames=64,
+				 bufsiz=SPIDEV_BUFSIZ):
+		self.log = logging.getLogger('spidev')
+		path = bus if isinstance(bus, str) else '/dev/spidev%d.%d' % (bus, cs)
+		self._fd = os.open(path, os.O_RDWR)
+		fcntl.ioctl(self._fd, SPI_IOC_WR_MODE, struct.pack('=B', mode))
+		fcntl.ioctl(self._fd, SPI_IOC_WR_BITS_PER_WORD, struct.pack('=B', bits_per_word))
+		fcntl.ioctl(self._fd, SPI_IOC_WR_MAX_SPEED_HZ, struct.pack('=I', speed_hz))
+		self._speed_hz = speed_hz
+		self._bits_per_word = bits_per_word
+		self._max_frames = max(1, min(max_frames, SPI_IOC_MAX_TRANSFERS, bufsiz // frame_size))
+		self._bufsiz = bufsiz
+		self._transfers = (_SpiIocTransfer * self._max_frames)()
+		self._tx = (ctypes.c_uint8 * (self._max_frames * frame_size))()
+		self._tx_addr = ctypes.addressof(self._tx)
+		self._requests = {}
+		# number of queued frames and bytes used in TX buffer
+		self._count = 0
+		self._used = 0
+		for t in self._transfers:
+			t.speed_hz = speed_hz
+			t.bits_per_word = bits_per_word
+
+	def close(self):
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def get_write_fn(self):
+		return self.write
+
+	'''
+	Sends single frame, or queues it when called within batch()
+	'''
+	def write(self, data):
+		self._queue(data)
+		if not self._batching:
+			self.flush()
+
+	'''
+	Sends all frames, CS is deasserted between frames. Frames are sent in as few ioctls as possible.
+	'''
+	def write_frames(self, frames):
+		for frame in frames:
+			self._queue(frame)
+		self.flush()
+
+	@contextmanager
+	def batch(self):
+		self._batching = True
+		try:
+			yield self
+		finally:
+			self._batching = False
+			self.flush()
+
+	def flush(self):
+		if not self._count:
+			return
+		n = self._count
+		for i in range(n - 1):
+			self._transfers[i].cs_change = 1
+		# cs_change on the last transfer would keep CS asserted after the message
+		self._transfers[n - 1].cs_change = 0
+		request = self._requests.get(n)
+		if request is None:
+			request = self._requests[n] = spi_ioc_message(n)
+		self.log.debug('>: %d frames, %d bytes', n, self._used)
+		fcntl.ioctl(self._fd, request, self._transfers)
+		self._count = 0
+		self._used = 0
+
+	def _queue(self, data):
+		length = len(data)
+		if length > len(self._tx):
+			# does not fit preallocated buffer at all, send it on its own
+			self.flush()
+			self._write_large(data)
+			return
+		if self._count == self._max_frames or self._used + length > len(self._tx):
+			self.flush()
+		t = self._transfers[self._count]
+		t.tx_buf = self._tx_addr + self._used
+		t.len = length
+		self._tx[self._used:self._used + length] = data
+		self._count += 1
+		self._used += length
+
+	def _write_large(self, data):
+		# single frame can not be split across transfers, bufsiz is the only hard limit
+		if len(data) > self._bufsiz:
+			raise ValueError('Frame of %d bytes exceeds spidev buffer size %d' % (len(data), self._bufsiz))
+		buf = (ctypes.c_uint8 * len(data)).from_buffer_copy(bytes(data))
+		t = _SpiIocTransfer()
+		t.tx_buf = ctypes.addressof(buf)
+		t.len = len(data)
+		t.speed_hz = self._speed_hz
+		t.bits_per_word = self._bits_per_word
+		fcntl.ioctl(self._fd, spi_ioc_message(1), t)
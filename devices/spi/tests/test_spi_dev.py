@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+'''
+SpiDev tests without hardware, spidev ioctls are recorded by FakeSpidev.
+
+	python -m pytest devices/spi/tests/test_spi_dev.py
+'''
+
+import ctypes
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from devices.spi import spi_dev
+from devices.spi.AD5689R import AD5689
+
+
+class FakeSpidev:
+	def __init__(self):
+		self.settings = []
+		# list of messages, message is list of (tx bytes, cs_change)
+		self.messages = []
+
+	def ioctl(self, fd, request, arg):
+		if isinstance(arg, bytes):
+			self.settings.append(request)
+			return 0
+		transfers = [arg] if isinstance(arg, spi_dev._SpiIocTransfer) else arg
+		count = (request >> 16 & 0x3FFF) // spi_dev.SPI_IOC_TRANSFER_SIZE
+		self.messages.append([(ctypes.string_at(t.tx_buf, t.len), t.cs_change) for t in transfers[:count]])
+		return 0
+
+
+@pytest.fixture
+def spidev(monkeypatch):
+	fake = FakeSpidev()
+	monkeypatch.setattr(spi_dev.fcntl, 'ioctl', fake.ioctl)
+	monkeypatch.setattr(spi_dev.os, 'open', lambda path, flags: 3)
+	monkeypatch.setattr(spi_dev.os, 'close', lambda fd: None)
+	return fake
+
+
+def test_setup_and_single_write(spidev):
+	spi = spi_dev.SpiDev(0, 0, mode=1)
+	assert spidev.settings == [spi_dev.SPI_IOC_WR_MODE, spi_dev.SPI_IOC_WR_BITS_PER_WORD, spi_dev.SPI_IOC_WR_MAX_SPEED_HZ]
+	spi.write(b'\x01\x02\x03')
+	assert spidev.messages == [[(b'\x01\x02\x03', 0)]]
+
+
+def test_batch_is_single_message(spidev):
+	spi = spi_dev.SpiDev(0)
+	dac = AD5689(spi.get_write_fn())
+	with spi.batch():
+		dac.write_code_and_update(AD5689.DAC_Channel.DAC_A, 0x1234)
+		dac.write_code_and_update(AD5689.DAC_Channel.DAC_B, 0x5678)
+	assert len(spidev.messages) == 1
+	frames = spidev.messages[0]
+	assert [len(tx) for tx, cs_change in frames] == [3, 3]
+	# CS toggled between frames, released after the last one
+	assert [cs_change for tx, cs_change in frames] == [1, 0]
+	assert frames[0][0][1:] == b'\x12\x34' and frames[1][0][1:] == b'\x56\x78'
+
+
+def test_frames_split_over_max_frames(spidev):
+	spi = spi_dev.SpiDev(0, max_frames=2)
+	spi.write_frames([bytes([i, 0, 0]) for i in range(5)])
+	assert [len(m) for m in spidev.messages] == [2, 2, 1]
+	assert [tx[0] for m in spidev.messages for tx, cs_change in m] == list(range(5))
+
+
+def test_large_frame(spidev):
+	spi = spi_dev.SpiDev(0, max_frames=1, bufsiz=8)
+	spi.write(bytes(range(6)))
+	assert spidev.messages == [[(bytes(range(6)), 0)]]
+	with pytest.raises(ValueError):
+		spi.write(bytes(9))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+'''
+Import time benchmark, every module is imported in a fresh interpreter.
+Fails if importing the package or a driver takes longer than the budget, or pulls in
+optional heavy dependencies.
+
+	python devices/tests/bench_import.py [budget in ms]
+'''
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_BUDGET_MS = 50.0
+HEAVY_MODULES = ('numpy', 'pyftdi', 'usb')
+MODULES = [
+	'devices',
+	'devices.i2c.PAC193x',
+	'devices.i2c.AD7156',
+	'devices.i2c.AD7147',
+	'devices.i2c.SHT3x',
+	'devices.spi.AD5689R',
+	'devices.spi.AD56x4R',
+]
+
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print('%.3f %s' % (elapsed, ','.join(heavy)))
+'''
+
+
+def measure(module, runs=5):
+	best = None
+	heavy = ''
+	for _ in range(runs):
+		out = subprocess.check_output([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+									  cwd=ROOT, text=True).split()
+		elapsed = float(out[0])
+		heavy = out[1] if len(out) > 1 else ''
+		best = elapsed if best is None else min(best, elapsed)
+	return best, heavy
+
+
+if __name__ == '__main__':
+	budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+	failed = False
+	for module in MODULES:
+		elapsed, heavy = measure(module)
+		ok = elapsed <= budget and not heavy
+		failed |= not ok
+		print('%-24s %8.3f ms %s%s' % (module, elapsed, 'OK' if ok else 'FAIL', ' (imports %s)' % heavy if heavy else ''))
+	sys.exit(1 if failed else 0)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+'''
+Windowed aggregation tests on synthetic readings.
+
+	python -m pytest devices/tests/test_aggregate.py
+'''
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.aggregate import Aggregator
+
+
+def test_aggregator_windows():
+	agg = Aggregator(channels=2, resolutions=(1, 10))
+	summaries = []
+	for t in range(12):
+		summaries += agg.push(t + 0.5, [t, 2.0])
+	seconds = [s for s in summaries if s.resolution == 1]
+	assert len(seconds) == 11 and [s.start for s in seconds[:3]] == [0, 1, 2]
+	tens = [s for s in summaries if s.resolution == 10]
+	assert len(tens) == 1 and tens[0].count == 10
+	assert tens[0].min[0] == 0 and tens[0].max[0] == 9 and tens[0].mean[0] == 4.5 and tens[0].last[0] == 9
+	# constant channel integrates to value * covered time
+	assert tens[0].integral[1] == pytest.approx(2.0 * 9.5)
+
+
+def test_aggregator_gap_keeps_area():
+	agg = Aggregator(channels=1, resolutions=(1,))
+	summaries = []
+	for t in (0, 0.5, 3.5, 3.9):
+		summaries += agg.push(t, [1.0])
+	# windows 1 and 2 are merged into a single gap summary
+	assert [(s.start, s.count, s.windows) for s in summaries] == [(0, 2, 1), (1, 0, 2)]
+	assert np.isnan(summaries[1].mean[0]) and summaries[1].last[0] == 1.0
+	assert summaries[1].integral[0] == pytest.approx(2.0)
+	total = sum(s.integral[0] for s in summaries) + sum(s.integral[0] for s in agg.flush())
+	assert total == pytest.approx(3.9)
+
+
+def test_aggregator_long_gap_is_single_summary():
+	agg = Aggregator(channels=1)
+	agg.push(0.5, [2.0])
+	summaries = agg.push(86400.5, [2.0])
+	assert [(s.resolution, s.windows) for s in summaries] == [(1, 1), (1, 86399), (60, 1), (60, 1439),
+															  (3600, 1), (3600, 23)]
+	assert sum(s.integral[0] for s in summaries if s.resolution == 1) == pytest.approx(2.0 * 86399.5)
+
+
+def test_aggregator_rejects_older_timestamp():
+	agg = Aggregator(channels=1, resolutions=(1,))
+	agg.push(5.2, [1.0])
+	with pytest.raises(ValueError):
+		agg.push(4.1, [1.0])
+	# rejected reading did not change the state
+	assert [s.start for s in agg.push(6.5, [1.0])] == [5]
+	assert agg.push(6.9, [1.0]) == []
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+'''
+Delta + bit-packing codec round trip tests.
+
+	python -m pytest devices/tests/test_codec.py
+'''
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.codec import encode_block, decode_block, iter_blocks
+
+
+def test_codec_round_trip():
+	rng = np.random.default_rng(1)
+	codes = np.cumsum(rng.integers(-20, 20, size=(100, 4)), axis=0) + 0x8000
+	codes[:, 2] = 1234
+	blob = encode_block(codes)
+	assert np.array_equal(decode_block(blob), codes)
+	# static channel: first value and zero bit width only
+	assert len(blob) < codes.size * 2
+
+
+def test_codec_concatenated_blocks():
+	blocks = [np.array([0, 0xFFF, 0, 7]), np.array([[1, -5]]), np.arange(10)]
+	decoded = list(iter_blocks(b''.join(encode_block(b) for b in blocks)))
+	assert [d.shape for d in decoded] == [(4,), (1, 2), (10,)]
+	assert all(np.array_equal(d, b) for d, b in zip(decoded, blocks))
+	with pytest.raises(ValueError):
+		encode_block([])
+
+
+def test_codec_keeps_shape():
+	codes = np.array([0x3000, 0x3001, 0x2FFF])
+	assert decode_block(encode_block(codes)).shape == (3,)
+	assert decode_block(encode_block(codes[:, None])).shape == (3, 1)
+	with pytest.raises(ValueError):
+		decode_block(b'\x01' + encode_block(codes)[1:])
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+'''
+PID, LoopStats and ControlLoop tests with fake measurement and actuator functions.
+
+	python -m pytest devices/tests/test_control.py
+'''
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.control import PID, LoopStats, ControlLoop, pac_current_measure, dac_actuator
+from devices.i2c.PAC193x import Channel
+from devices.spi.AD5689R import AD5689
+
+
+def test_pid_terms():
+	pid = PID(kp=2.0, ki=1.0, kd=0.5, setpoint=1.0)
+	# first call has no derivative
+	assert pid(0.0, 0.1) == pytest.approx(2.0 + 0.1)
+	# error 0.5: p 1.0, integral 0.1 + 0.05, derivative (0.5 - 1.0) / 0.1 * 0.5
+	assert pid(0.5, 0.1) == pytest.approx(1.0 + 0.15 - 2.5)
+	pid.reset()
+	assert pid(1.0, 0.1) == 0
+
+
+def test_pid_anti_windup():
+	pid = PID(kp=0.0, ki=10.0, setpoint=1.0, output_min=0.0, output_max=1.0)
+	for _ in range(100):
+		assert pid(0.0, 0.1) == 1.0
+	# integrator did not grow while saturated, so output drops as soon as error changes sign
+	assert pid(2.0, 0.1) == 0.0
+	pid = PID(kp=0.0, ki=10.0, setpoint=1.0, output_max=1.0)
+	assert pid(0.95, 0.1) == pytest.approx(0.05)
+	assert pid(1.05, 0.1) == pytest.approx(0.0)
+
+
+def test_loop_stats():
+	stats = LoopStats(0.01)
+	for period in (0.009, 0.011, 0.010, 0.010):
+		stats.add(period, 0.001)
+	stats.add(0.010, 0.004)
+	assert stats.count == 5
+	assert stats.period_mean == pytest.approx(0.010)
+	assert stats.period_min == 0.009 and stats.period_max == 0.011
+	assert stats.jitter == pytest.approx((0.000002 / 5) ** 0.5)
+	assert stats.jitter_max == pytest.approx(0.001)
+	assert stats.busy_max == 0.004
+
+
+def test_loop_runs_and_stops():
+	outputs = []
+	loop = ControlLoop(0.002, lambda: 0.25, lambda measurement, dt: measurement * 2, outputs.append)
+	loop.start()
+	time.sleep(0.05)
+	assert loop.running
+	assert loop.stop(1.0)
+	assert not loop.running
+	assert len(outputs) > 5 and set(outputs) == {0.5}
+	assert loop.stats.count == len(outputs) - 1
+	assert loop.stats.period_mean == pytest.approx(0.002, abs=0.001)
+
+
+def test_loop_error_stops_thread():
+	def measure_fn():
+		raise IOError('bus error')
+
+	loop = ControlLoop(0.001, measure_fn, lambda measurement, dt: 0, lambda value: None)
+	loop.start()
+	assert loop.stop(1.0)
+	assert isinstance(loop.error, IOError)
+
+
+def test_restart_waits_for_previous_thread():
+	release = threading.Event()
+	calls = []
+
+	def actuate_fn(value):
+		calls.append(value)
+		release.wait()
+
+	loop = ControlLoop(0.001, lambda: 0, lambda measurement, dt: 0, actuate_fn)
+	loop.start()
+	while not calls:
+		time.sleep(0.001)
+	# thread is blocked in actuator, stop times out and thread keeps running
+	assert not loop.stop(0.01)
+	assert loop.running
+	with pytest.raises(RuntimeError):
+		loop.start()
+	release.set()
+	assert loop.stop(1.0)
+	count = len(calls)
+	loop.start()
+	assert loop.stop(1.0)
+	assert len(calls) > count
+
+
+class FakePac:
+	def __init__(self):
+		self.refreshes = 0
+
+	def refresh_v(self):
+		self.refreshes += 1
+
+	def get_currents(self):
+		return [0.1, 0.2, 0.3, 0.4]
+
+
+def test_measure_and_actuator_helpers():
+	pac = FakePac()
+	measure_fn = pac_current_measure(pac, Channel.C)
+	assert pac.refreshes == 1
+	assert measure_fn() == 0.3 and pac.refreshes == 2
+	frames = []
+	dac = AD5689(lambda frame: frames.append(bytes(frame)), reference_value=2.5)
+	actuate_fn = dac_actuator(dac, AD5689.DAC_Channel.DAC_A)
+	actuate_fn(1.25)
+	actuate_fn(5.0)
+	assert frames[0][1:] == bytes([0x80, 0x00])
+	assert frames[1][1:] == bytes([0xFF, 0xFF])
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+'''
+Polled wait function tests.
+
+	python -m pytest devices/tests/test_gpio.py
+'''
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.gpio import get_polled_wait_fn
+
+
+def test_polled_wait_fn_reports_edges():
+	level = [True]
+	wait_fn = get_polled_wait_fn(lambda: level[0], poll_interval=0.001)
+	assert wait_fn(0.01)
+	# pin still active, no new event
+	assert not wait_fn(0.01)
+	level[0] = False
+	assert not wait_fn(0.01)
+	timer = threading.Timer(0.01, lambda: level.__setitem__(0, True))
+	timer.start()
+	assert wait_fn(1.0)
+	timer.join()
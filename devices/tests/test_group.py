@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+'''
+DeviceGroup tests with fake devices, no hardware needed.
+
+	python -m pytest devices/tests/test_group.py
+'''
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.group import DeviceGroup, stack_results
+from devices.records import PAC193xReading
+
+
+class FakeDevice:
+	def __init__(self, index, active):
+		self.index = index
+		self._active = active
+
+	def read(self, scale=1):
+		self._active.append(self.index)
+		time.sleep(0.01)
+		overlap = len(self._active) > 1
+		self._active.remove(self.index)
+		return self.index * scale, overlap
+
+	def fail(self):
+		raise IOError('device %d' % self.index)
+
+
+def test_group_serializes_shared_bus():
+	active = []
+	group = DeviceGroup([FakeDevice(i, active) for i in range(4)], buses=['a'] * 4)
+	with group:
+		results = group.run('read', scale=2)
+	assert [r[0] for r in results] == [0, 2, 4, 6]
+	assert not any(r[1] for r in results)
+
+
+def test_group_parallel_buses_and_errors():
+	active = []
+	group = DeviceGroup([FakeDevice(i, active) for i in range(4)])
+	values, overlaps = group.gather(lambda device: device.read())
+	assert list(values) == [0, 1, 2, 3]
+	results = group.run('fail', return_exceptions=True)
+	assert all(isinstance(r, IOError) for r in results)
+	with pytest.raises(IOError):
+		group.run('fail')
+	group.close()
+	with pytest.raises(ValueError):
+		DeviceGroup([FakeDevice(0, active)], buses=[1, 2])
+
+
+def test_stack_results():
+	readings = [PAC193xReading(i, [i] * 4, [0.5] * 4) for i in range(3)]
+	fields = stack_results(readings)
+	assert fields['bus_voltage'].shape == (3, 4) and list(fields['timestamp']) == [0, 1, 2]
+	assert stack_results([b'\x01\x02', b'\x03\x04']).shape == (2, 2)
+	assert stack_results([{'a': 1}, {'a': 2}])['a'].tolist() == [1, 2]
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+'''
+AdaptivePoller interval tests.
+
+	python -m pytest devices/tests/test_polling.py
+'''
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.polling import AdaptivePoller
+from devices.records import PAC193xReading
+
+
+def test_poller_backoff_and_reset():
+	poller = AdaptivePoller(0.01, max_interval=0.05, threshold=1)
+	buf = [0, 0]
+	assert poller.update(buf) == 0.01
+	assert poller.update(buf) == 0.02
+	buf[1] = 0.5
+	assert poller.update(buf) == 0.04
+	assert poller.update(buf) == 0.05
+	# buffer reused between reads, change is still seen
+	buf[1] = 5
+	assert poller.update(buf) == 0.01
+
+
+def test_poller_arrays_and_records():
+	poller = AdaptivePoller(0.01, threshold=10)
+	frame = np.zeros((2, 12), dtype=np.uint16)
+	poller.update(frame)
+	frame[1, 3] = 5
+	assert poller.update(frame) == 0.02
+	# unsigned codes going down do not wrap around
+	frame[1, 3] = 0
+	assert poller.update(frame) == 0.04
+	poller.reset()
+	reading = PAC193xReading()
+	poller.update(reading)
+	reading.timestamp = 100.0
+	assert poller.update(reading) == 0.02
+	reading.current[2] = 20
+	assert poller.update(reading) == 0.01
+	with pytest.raises(ValueError):
+		AdaptivePoller(0.1, max_interval=0.01)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+'''
+Measurement record and RingBuffer tests.
+
+	python -m pytest devices/tests/test_records.py
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.records import SHT3xReading, AD7147Reading, RingBuffer
+
+
+def test_ring_buffer():
+	ring = RingBuffer(3, SHT3xReading)
+	assert ring.latest() is None
+	for i in range(5):
+		ring.append(SHT3xReading(i, 20.0 + i, 40.0))
+	assert len(ring) == 3
+	assert list(ring.to_array()['timestamp']) == [2, 3, 4]
+	assert ring.latest()['temperature'] == 24.0
+	ring.append_values(5, 1.0, 2.0)
+	assert list(ring.to_array()['timestamp']) == [3, 4, 5]
+	ring.clear()
+	assert len(ring) == 0 and len(ring.to_array()) == 0
+
+
+def test_record_reuse():
+	reading = AD7147Reading()
+	stages = reading.stages
+	assert len(stages) == 12 and reading.stamp() is reading
+	assert reading.timestamp > 0 and reading.stages is stages
+	assert len(reading.as_tuple()) == len(AD7147Reading.DTYPE)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+'''
+Driver registry and identification tests.
+
+	python -m pytest devices/tests/test_registry.py
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import devices
+
+
+def test_registry():
+	assert devices.get_driver_info('pac1934').name == 'PAC193x'
+	assert {info.bus for info in devices.list_drivers('spi')} == {'spi'}
+	with pytest.raises(KeyError):
+		devices.get_driver_info('nope')
+	assert devices.get_driver('AD7156').__name__ == 'AD7156'
+
+
+def test_identify():
+	def read_fn(reg, num_bytes):
+		if reg == 0xFD:
+			return bytes([0x5B, 0x5D, 0x03])
+		raise IOError('no ack')
+
+	assert devices.identify(0x10, read_fn).name == 'PAC193x'
+	assert devices.identify(0x48, read_fn) is None
+	assert devices.identify(0x2c, lambda reg, n: bytes([0x14, 0x72])).name == 'AD7147'
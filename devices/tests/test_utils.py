@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+'''
+Register range snapshot helpers tests.
+
+	python -m pytest devices/tests/test_utils.py
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from devices.utils import read_register_ranges, write_register_ranges, compare_register_blobs
+
+
+def test_register_ranges():
+	memory = bytearray(range(256))
+
+	def read_reg(reg, num_bytes):
+		return bytes(memory[reg:reg + num_bytes])
+
+	def write_reg(reg, data):
+		memory[reg:reg + len(data)] = bytes(data)
+
+	ranges = [(0x10, 2), (0x20, 1)]
+	blob = read_register_ranges(read_reg, ranges)
+	assert blob == bytes([0x10, 0x11, 0x20])
+	write_register_ranges(write_reg, ranges, bytes([1, 2, 3]))
+	assert memory[0x10:0x12] == bytes([1, 2]) and memory[0x20] == 3
+	assert compare_register_blobs(b'\x0F', b'\x0E', b'\xFE')
+	assert not compare_register_blobs(b'\x0F', b'\x0E')
@@ -18,3 +18,43 @@ def set_bits_in_byte_8(source, lsb_index, target, target_width=None):
 
 def set_bits_in_byte_16(source, lsb_index, target, target_width=None):
 	return set_bits_in_byte(source, lsb_index, target, 16, target_width)
+
+
+'''
+Register space snapshots: ranges is list of (start register, register count) tuples,
+word_size is number of bytes per register.
+Each range is read and written as a single burst, blob is plain concatenation of all the ranges.
+'''
+def read_register_ranges(read_reg, ranges, word_size=1):
+	blob = bytearray()
+	for start, count in ranges:
+		blob.extend(read_reg(start, count * word_size))
+	return bytes(blob)
+
+
+def write_register_ranges(write_reg, ranges, blob, word_size=1):
+	expected = sum(count for _, count in ranges) * word_size
+	if len(blob) != expected:
+		raise ValueError('Snapshot size %d does not match expected %d' % (len(blob), expected))
+	offset = 0
+	for start, count in ranges:
+		size = count * word_size
+		write_reg(start, list(blob[offset:offset + size]))
+		offset += size
+
+
+# compares snapshots ignoring bits not set in mask (e.g. read-only status bits)
+def compare_register_blobs(expected, actual, mask=None):
+	if len(expected) != len(actual):
+		return False
+	if mask is None:
+		return bytes(expected) == bytes(actual)
+	return all((e ^ a) & m == 0 for e, a, m in zip(expected, actual, mask))
+
+
+# compares snapshot restored to the device with its readback, logs mismatch
+def verify_register_blob(log, expected, actual, mask=None):
+	if compare_register_blobs(expected, actual, mask):
+		return True
+	log.error('Configuration readback does not match the snapshot')
+	return False